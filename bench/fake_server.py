@@ -0,0 +1,181 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+from urllib.parse import parse_qsl, urlparse
+
+
+class FakeServerConfig:
+    """
+    Behaviour of the stand-in content API.
+    """
+
+    def __init__(
+        self,
+        total_count: int = 1000,
+        payload_bytes: int = 2048,
+        latency_ms: float = 20.0,
+        jitter_ms: float = 5.0,
+        rate_429: float = 0.0,
+        retry_after: Optional[float] = 0.5,
+        stall_ids: tuple[str, ...] = (),
+        stall_ms: float = 0.0,
+    ):
+        self.total_count = total_count
+        self.payload_bytes = payload_bytes
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        # Detail requests for these content IDs take `stall_ms` instead of the usual latency
+        self.stall_ids = tuple(stall_ids)
+        self.stall_ms = stall_ms
+
+    def to_dict(self) -> dict[str, Any]:
+        return dict(self.__dict__)
+
+
+class _BenchHTTPServer(ThreadingHTTPServer):
+    # The default backlog of 5 drops SYNs in cold bursts, adding 1 s retransmit stalls
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class FakeMicrocmsServer:
+    """
+    Local HTTP server answering `/{service_domain}/api/v1/{endpoint}[/{id}]`
+    like the microCMS list and detail APIs.
+    """
+
+    def __init__(self, config: FakeServerConfig, host: str = "127.0.0.1", port: int = 0):
+        self.config = config
+        self.requests_served = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._body = "x" * max(0, config.payload_bytes)
+        self._server = _BenchHTTPServer((host, port), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/{{service_domain}}/api/v1"
+
+    def start(self) -> "FakeMicrocmsServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def record(self, index: int) -> dict[str, Any]:
+        return {
+            "id": f"content-{index}",
+            "title": f"Content {index}",
+            "createdAt": "2024-01-01T00:00:00.000Z",
+            "updatedAt": "2024-01-02T00:00:00.000Z",
+            "publishedAt": "2024-01-02T00:00:00.000Z",
+            "revisedAt": "2024-01-02T00:00:00.000Z",
+            "category": {"id": f"category-{index % 5}", "name": f"Category {index % 5}"},
+            "body": f"<p>{self._body}</p>",
+        }
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; avoid Nagle/delayed-ACK stalls
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                server._handle(self)
+
+        return Handler
+
+    def _handle(self, handler: BaseHTTPRequestHandler) -> None:
+        config = self.config
+        with self._lock:
+            self.requests_served += 1
+
+        delay = max(0.0, config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)) / 1000
+        path = handler.path.split("?", 1)[0]
+        if config.stall_ids and path.rsplit("/", 1)[-1] in config.stall_ids:
+            delay = config.stall_ms / 1000
+        if delay:
+            time.sleep(delay)
+
+        if config.rate_429 and random.random() < config.rate_429:
+            with self._lock:
+                self.throttled += 1
+            headers = {"Retry-After": str(config.retry_after)} if config.retry_after is not None else {}
+            self._send(handler, 429, {"message": "Too Many Requests"}, headers)
+            return
+
+        url = urlparse(handler.path)
+        query = dict(parse_qsl(url.query))
+        parts = url.path.strip("/").split("/")
+        if len(parts) < 4 or parts[1:3] != ["api", "v1"]:
+            self._send(handler, 404, {"message": "Not Found"})
+            return
+
+        if len(parts) == 5:
+            index = self._parse_index(parts[4])
+            if index is None:
+                self._send(handler, 404, {"message": "Content not found"})
+                return
+            self._send(handler, 200, self._project(self.record(index), query.get("fields")))
+            return
+
+        if "ids" in query:
+            indexes = [i for i in (self._parse_index(cid) for cid in query["ids"].split(",")) if i is not None]
+            total = len(indexes)
+        else:
+            indexes = None
+            total = config.total_count
+
+        offset = int(query.get("offset", 0))
+        limit = int(query.get("limit", 10))
+        if indexes is None:
+            page = range(offset, min(offset + limit, total))
+        else:
+            page = indexes[offset:offset + limit]
+
+        self._send(handler, 200, {
+            "contents": [self._project(self.record(i), query.get("fields")) for i in page],
+            "totalCount": total,
+            "limit": limit,
+            "offset": offset,
+        })
+
+    def _parse_index(self, content_id: str) -> Optional[int]:
+        try:
+            index = int(content_id.rsplit("-", 1)[-1])
+        except ValueError:
+            return None
+        return index if 0 <= index < self.config.total_count else None
+
+    @staticmethod
+    def _project(record: dict[str, Any], fields: Optional[str]) -> dict[str, Any]:
+        if not fields:
+            return record
+        wanted = {f.split(".")[0] for f in fields.split(",")}
+        return {k: v for k, v in record.items() if k in wanted}
+
+    @staticmethod
+    def _send(handler: BaseHTTPRequestHandler, status: int, body: Any, headers: Optional[dict[str, str]] = None) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(payload)
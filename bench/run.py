@@ -0,0 +1,272 @@
+"""
+Benchmark harness for the microCMS tools against a local fake API.
+
+    python -m bench.run                      # every scenario
+    python -m bench.run -s detail -s full_detail_100 -n 20
+    python -m bench.run --json bench_output.json
+
+Each scenario runs in a fresh subprocess so peak RSS is measured per scenario.
+"""
+import argparse
+import importlib
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any
+
+from bench.fake_server import FakeMicrocmsServer, FakeServerConfig
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TOOLS = {
+    "get_content_list": ("tools.get_content_list", "GetContentListTool"),
+    "get_content_detail": ("tools.get_content_detail", "GetContentDetailTool"),
+    "get_full_contents": ("tools.get_full_contents", "GetFullContentsTool"),
+}
+
+SCENARIOS: dict[str, dict[str, Any]] = {
+    "list": {
+        "tool": "get_content_list",
+        "params": {"endpoint": "news", "limit": 10, "use_cache": False},
+        "server": {},
+    },
+    "detail": {
+        "tool": "get_content_detail",
+        "params": {"endpoint": "news", "content_id": "content-1", "use_cache": False},
+        "server": {},
+    },
+    "detail_cached": {
+        "tool": "get_content_detail",
+        "params": {"endpoint": "news", "content_id": "content-1"},
+        "server": {},
+    },
+    "full_batch_100": {
+        "tool": "get_full_contents",
+        "params": {"endpoint": "news", "limit": 100, "use_cache": False},
+        "server": {},
+    },
+    "full_detail_100": {
+        "tool": "get_full_contents",
+        "params": {"endpoint": "news", "limit": 100, "fetch_mode": "detail", "max_concurrent": 20, "use_cache": False},
+        "server": {},
+    },
+    "full_detail_429": {
+        "tool": "get_full_contents",
+        "params": {"endpoint": "news", "limit": 100, "fetch_mode": "detail", "max_concurrent": 20, "use_cache": False},
+        "server": {"rate_429": 0.1, "retry_after": 0.2},
+    },
+    "full_all_pages_stream": {
+        "tool": "get_full_contents",
+        "params": {"endpoint": "news", "all_pages": True, "output_mode": "stream", "use_cache": False},
+        "server": {"total_count": 2000},
+        "iterations": 3,
+    },
+    # A detail request at the head of the reorder window stalls past the time budget;
+    # the invocation must still return what arrived and a resume cursor
+    "full_detail_stalled_head": {
+        "tool": "get_full_contents",
+        "params": {"endpoint": "news", "limit": 30, "fetch_mode": "detail", "reorder_window": 10, "use_cache": False},
+        "server": {"latency_ms": 300.0, "stall_ids": ("content-5",), "stall_ms": 10_000.0},
+        "env": {"MICROCMS_INVOCATION_BUDGET": "4"},
+        "expect_resume": True,
+        "iterations": 1,
+    },
+    "full_detail_large_payload": {
+        "tool": "get_full_contents",
+        "params": {"endpoint": "news", "limit": 100, "fetch_mode": "detail", "max_concurrent": 20, "use_cache": False},
+        "server": {"payload_bytes": 200_000},
+        "iterations": 3,
+    },
+}
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+def count_outcome(final: Any) -> tuple[int, int]:
+    """
+    Items retrieved and errors reported by an invocation's final JSON message.
+    """
+    if not isinstance(final, dict):
+        return 0, 1
+    errors = len(final.get("errors") or [])
+    if "retrieved" in final:
+        return final["retrieved"], errors
+    if isinstance(final.get("contents"), list):
+        return len(final["contents"]), errors
+    return 1, errors
+
+
+def run_child(spec: dict[str, Any]) -> dict[str, Any]:
+    """
+    Invoke one tool `iterations` times in this process and measure it.
+    """
+    # dify_plugin patches the standard library on import, so import it before anything else
+    import dify_plugin  # noqa: F401
+    from dify_plugin.entities.tool import ToolRuntime
+
+    module_name, class_name = TOOLS[spec["tool"]]
+    tool_class = getattr(importlib.import_module(module_name), class_name)
+    runtime = ToolRuntime(credentials={"service_domain": "bench", "api_key": "bench-key"}, user_id=None, session_id=None)
+
+    latencies = []
+    first_message = []
+    first_json = []
+    messages = 0
+    retrieved = 0
+    errors = 0
+    resumable = 0
+    started = time.perf_counter()
+    for _ in range(spec["iterations"]):
+        tool = tool_class(runtime=runtime, session=None)
+        invoke_started = time.perf_counter()
+        seen_message = seen_json = False
+        final = None
+        for message in tool._invoke(dict(spec["params"])):
+            now = time.perf_counter() - invoke_started
+            messages += 1
+            if not seen_message:
+                first_message.append(now)
+                seen_message = True
+            if hasattr(message.message, "json_object"):
+                if not seen_json:
+                    first_json.append(now)
+                    seen_json = True
+                if set(message.message.json_object) != {"metrics"}:
+                    final = message.message.json_object
+            elif getattr(message.message, "text", "").startswith(("Error", "Network error")):
+                errors += 1
+        latencies.append(time.perf_counter() - invoke_started)
+        if isinstance(final, dict) and final.get("resume_cursor"):
+            resumable += 1
+        item_count, error_count = count_outcome(final)
+        retrieved += item_count
+        errors += error_count
+    elapsed = time.perf_counter() - started
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+    return {
+        "elapsed": elapsed,
+        "messages": messages,
+        "retrieved": retrieved,
+        "errors": errors,
+        "resumable": resumable,
+        "latencies": latencies,
+        "first_message": first_message,
+        "first_json": first_json,
+        "peak_rss_mb": peak_rss_mb,
+    }
+
+
+def run_scenario(name: str, iterations: int) -> dict[str, Any]:
+    scenario = SCENARIOS[name]
+    server = FakeMicrocmsServer(FakeServerConfig(**scenario["server"])).start()
+    try:
+        spec = {
+            "tool": scenario["tool"],
+            "params": scenario["params"],
+            "iterations": scenario.get("iterations", iterations),
+        }
+        env = {**os.environ, **scenario.get("env", {}), "MICROCMS_API_BASE_URL": server.base_url}
+        completed = subprocess.run(
+            [sys.executable, "-m", "bench.run", "--child", json.dumps(spec)],
+            cwd=ROOT_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"Scenario '{name}' failed:\n{completed.stderr}")
+        child = json.loads(completed.stdout.strip().splitlines()[-1])
+    finally:
+        server.stop()
+
+    latencies = child["latencies"]
+    errors = child["errors"]
+    # A scenario expecting a cut-short run fails unless every invocation returned items and a cursor
+    if scenario.get("expect_resume") and (child["resumable"] < len(latencies) or not child["retrieved"]):
+        errors += 1
+    return {
+        "scenario": name,
+        "tool": scenario["tool"],
+        "server": server.config.to_dict(),
+        "iterations": len(latencies),
+        "upstream_requests": server.requests_served,
+        "throttled": server.throttled,
+        "requests_per_sec": server.requests_served / child["elapsed"] if child["elapsed"] else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "ttfm_ms": statistics.fmean(child["first_message"]) * 1000 if child["first_message"] else 0.0,
+        "ttf_json_ms": statistics.fmean(child["first_json"]) * 1000 if child["first_json"] else 0.0,
+        "messages": child["messages"],
+        "retrieved": child["retrieved"],
+        "errors": errors,
+        "peak_rss_mb": child["peak_rss_mb"],
+    }
+
+
+def print_table(results: list[dict[str, Any]]) -> None:
+    columns = [
+        ("scenario", "{}", 26),
+        ("upstream_requests", "{}", 9),
+        ("requests_per_sec", "{:.1f}", 9),
+        ("p50_ms", "{:.1f}", 9),
+        ("p95_ms", "{:.1f}", 9),
+        ("p99_ms", "{:.1f}", 9),
+        ("ttfm_ms", "{:.1f}", 9),
+        ("ttf_json_ms", "{:.1f}", 11),
+        ("peak_rss_mb", "{:.1f}", 11),
+        ("retrieved", "{}", 9),
+        ("errors", "{}", 6),
+    ]
+    headers = [
+        "scenario", "requests", "req/s", "p50 ms", "p95 ms", "p99 ms", "ttfm ms", "ttf-json ms", "peak RSS MB",
+        "items", "errors",
+    ]
+    print("  ".join(h.ljust(w) for h, (_, _, w) in zip(headers, columns)))
+    for result in results:
+        print("  ".join(fmt.format(result[key]).ljust(w) for key, fmt, w in columns))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the microCMS tools against a local fake API")
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS), help="scenario to run (repeatable)")
+    parser.add_argument("-n", "--iterations", type=int, default=10, help="invocations per scenario")
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(json.loads(args.child))))
+        return
+
+    results = [run_scenario(name, args.iterations) for name in (args.scenario or SCENARIOS)]
+    print_table(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    # Timings of runs whose fetches failed are meaningless
+    failed = [result["scenario"] for result in results if result["errors"]]
+    if failed:
+        sys.exit(f"Fetch errors in: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
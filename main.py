@@ -1,6 +1,13 @@
 from dify_plugin import Plugin, DifyPluginEnv
 
-plugin = Plugin(DifyPluginEnv(MAX_REQUEST_TIMEOUT=120))
+from utils.client import client_registry
+from utils.config import MAX_REQUEST_TIMEOUT
+
+plugin = Plugin(DifyPluginEnv(MAX_REQUEST_TIMEOUT=MAX_REQUEST_TIMEOUT))
 
 if __name__ == '__main__':
-    plugin.run()
+    try:
+        plugin.run()
+    finally:
+        # Release pooled keep-alive connections when the plugin process exits
+        client_registry.close_all()
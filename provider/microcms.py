@@ -1,9 +1,12 @@
 from typing import Any
-import requests
 
 from dify_plugin import ToolProvider
 from dify_plugin.errors.tool import ToolProviderCredentialValidationError
 
+from utils import config
+from utils.client import get_client
+from utils.probe import credential_probe
+
 
 class MicrocmsProvider(ToolProvider):
 
@@ -16,10 +19,18 @@ class MicrocmsProvider(ToolProvider):
         if not api_key:
             raise ToolProviderCredentialValidationError("API key is required")
 
-        # Skip API validation during credential setup
-        # The actual tool calls will validate API connectivity and provide better error messages
-        # This prevents issues during plugin installation when network conditions are uncertain
-        pass
+        # Register the pooled client so the tools share it from the first call
+        client = get_client(service_domain, api_key)
+        if not config.CREDENTIAL_PROBE:
+            return
+
+        # One cheap request with a short timeout; its pooled connection is reused by the first tool call.
+        # Only a definite rejection fails validation, so uncertain network conditions during
+        # installation do not block setup
+        probe_endpoint = (credentials.get("probe_endpoint", "") or "").strip()
+        result = credential_probe.check(client, probe_endpoint)
+        if result.valid is False:
+            raise ToolProviderCredentialValidationError(result.message)
 
     #########################################################################################
     # If OAuth is supported, uncomment the following functions.
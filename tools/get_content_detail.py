@@ -5,9 +5,19 @@ import requests
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
 
+from utils import codec
+from utils.client import get_client
+from utils.instrumentation import InvocationMetrics, run_instrumented
+from utils.projection import plan_projection, report_projection
+from utils.rate_limit import Deadline
+from utils.richtext import RichTextConverter, parse_rich_text_fields
+
 
 class GetContentDetailTool(Tool):
     def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage]:
+        yield from run_instrumented(self, "get_content_detail", tool_parameters, lambda metrics: self._run(tool_parameters, metrics))
+
+    def _run(self, tool_parameters: dict[str, Any], metrics: InvocationMetrics) -> Generator[ToolInvokeMessage]:
         # Get credentials
         service_domain = self.runtime.credentials.get("service_domain", "").strip()
         api_key = self.runtime.credentials.get("api_key", "").strip()
@@ -59,11 +69,38 @@ class GetContentDetailTool(Tool):
             if rich_editor_format:
                 params["richEditorFormat"] = rich_editor_format
 
-            # Make API request
-            url = f"https://{service_domain}.microcms.io/api/v1/{endpoint}/{content_id}"
-            headers = {"X-MICROCMS-API-KEY": api_key}
+            # Handle response cache
+            use_cache = tool_parameters.get("use_cache", True) is not False
+
+            # Handle output paths; they compile into the smallest fields and depth that cover them
+            baseline_params = dict(params)
+            projection = plan_projection(tool_parameters.get("output_paths", ""), fields)
+            if projection:
+                params["fields"] = projection.fields
+                params["depth"] = projection.depth
+
+            # Handle raw output
+            raw_output = tool_parameters.get("raw_output", False) is True
+
+            # Make API request over the shared connection pool
+            client = get_client(service_domain, api_key).bind(use_cache=use_cache, deadline=Deadline(), recorder=metrics)
+
+            # Handle rich text conversion; unchanged items reuse their cached conversion
+            converter = None
+            rich_text_fields = parse_rich_text_fields(tool_parameters.get("rich_text_fields", "") or "")
+            if rich_text_fields:
+                converter = RichTextConverter(
+                    client.scope,
+                    endpoint,
+                    rich_text_fields,
+                    text_format=tool_parameters.get("rich_text_format", "markdown") or "markdown",
+                    chunk_size=int(tool_parameters.get("rich_text_chunk_size", 0) or 0),
+                    use_cache=use_cache and not draft_key,
+                )
+                # Converted output has to be decoded first
+                raw_output = False
 
-            response = requests.get(url, headers=headers, params=params, timeout=30)
+            response = client.get(endpoint, content_id, params=params)
 
             # Handle response
             if response.status_code == 401:
@@ -87,9 +124,28 @@ class GetContentDetailTool(Tool):
                     yield self.create_text_message(f"HTTP error: {response.status_code}")
                 return
 
+            if projection:
+                yield from report_projection(
+                    self, client, endpoint, projection, baseline_params, content_id, 1,
+                    metrics if tool_parameters.get("include_metrics", False) else None,
+                    projected_bytes=len(response.content),
+                )
+
+            # Pass the upstream body through without decoding it
+            if raw_output:
+                yield self.create_text_message(
+                    f"Successfully retrieved content (ID: {codec.detail_id(response.content) or content_id}) "
+                    f"from endpoint '{endpoint}'"
+                )
+                yield self.create_text_message(response.text)
+                return
+
             # Parse and return successful response
             try:
                 data = response.json()
+                if converter is not None:
+                    data = converter.apply(data)
+                    metrics.annotate("rich_text", converter.stats())
 
                 # Success message
                 content_id = data.get("id", "Unknown")
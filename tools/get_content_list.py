@@ -1,13 +1,22 @@
 from collections.abc import Generator
-from typing import Any
+from typing import Any, Optional
 import requests
 
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
 
+from utils.client import get_client
+from utils.instrumentation import InvocationMetrics, run_instrumented
+from utils.pagination import PageFetchError, iter_page_responses
+from utils.rate_limit import Deadline
+from utils.richtext import RichTextConverter, parse_rich_text_fields
+
 
 class GetContentListTool(Tool):
     def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage]:
+        yield from run_instrumented(self, "get_content_list", tool_parameters, lambda metrics: self._run(tool_parameters, metrics))
+
+    def _run(self, tool_parameters: dict[str, Any], metrics: InvocationMetrics) -> Generator[ToolInvokeMessage]:
         # Get credentials
         service_domain = self.runtime.credentials.get("service_domain", "").strip()
         api_key = self.runtime.credentials.get("api_key", "").strip()
@@ -93,11 +102,38 @@ class GetContentListTool(Tool):
             if rich_editor_format:
                 params["richEditorFormat"] = rich_editor_format
 
-            # Make API request
-            url = f"https://{service_domain}.microcms.io/api/v1/{endpoint}"
-            headers = {"X-MICROCMS-API-KEY": api_key}
+            # Handle response cache
+            use_cache = tool_parameters.get("use_cache", True) is not False
+
+            # Handle raw output
+            raw_output = tool_parameters.get("raw_output", False) is True
+
+            # Make API request over the shared connection pool
+            client = get_client(service_domain, api_key).bind(use_cache=use_cache, deadline=Deadline(), recorder=metrics)
+
+            # Handle rich text conversion; unchanged items reuse their cached conversion
+            converter = None
+            rich_text_fields = parse_rich_text_fields(tool_parameters.get("rich_text_fields", "") or "")
+            if rich_text_fields:
+                converter = RichTextConverter(
+                    client.scope,
+                    endpoint,
+                    rich_text_fields,
+                    text_format=tool_parameters.get("rich_text_format", "markdown") or "markdown",
+                    chunk_size=int(tool_parameters.get("rich_text_chunk_size", 0) or 0),
+                    use_cache=use_cache and not draft_key,
+                )
+                # Converted output has to be decoded first
+                raw_output = False
+
+            # Handle all pages mode
+            if tool_parameters.get("all_pages", False):
+                yield from self._invoke_all_pages(client, endpoint, params, tool_parameters, raw_output, converter)
+                if converter is not None:
+                    metrics.annotate("rich_text", converter.stats())
+                return
 
-            response = requests.get(url, headers=headers, params=params, timeout=30)
+            response = client.get(endpoint, params=params)
 
             # Handle response
             if response.status_code == 401:
@@ -121,9 +157,22 @@ class GetContentListTool(Tool):
                     yield self.create_text_message(f"HTTP error: {response.status_code}")
                 return
 
+            # Pass the upstream body through without decoding it
+            if raw_output:
+                envelope = response.list_envelope()
+                yield self.create_text_message(
+                    f"Successfully retrieved {self._page_item_count(envelope)} items from endpoint '{endpoint}' "
+                    f"(total: {envelope['totalCount']} items, limit: {envelope['limit']}, offset: {envelope['offset']})"
+                )
+                yield self.create_text_message(response.text)
+                return
+
             # Parse and return successful response
             try:
                 data = response.json()
+                if converter is not None:
+                    data = {**data, "contents": [converter.apply(item) for item in data.get("contents", [])]}
+                    metrics.annotate("rich_text", converter.stats())
 
                 # Success message
                 total_count = data.get("totalCount", 0)
@@ -145,4 +194,56 @@ class GetContentListTool(Tool):
         except requests.RequestException as e:
             yield self.create_text_message(f"Network error: {str(e)}")
         except Exception as e:
-            yield self.create_text_message(f"Error: {str(e)}")
\ No newline at end of file
+            yield self.create_text_message(f"Error: {str(e)}")
+
+    def _invoke_all_pages(
+        self,
+        client,
+        endpoint: str,
+        params: dict[str, Any],
+        tool_parameters: dict[str, Any],
+        raw_output: bool,
+        converter: Optional[RichTextConverter] = None,
+    ) -> Generator[ToolInvokeMessage]:
+        max_concurrent = tool_parameters.get("max_concurrent", 5)
+        max_concurrent = min(max(int(max_concurrent or 5), 1), 10)
+
+        retrieved = 0
+        total_count = 0
+        try:
+            # Each page is its own message so downstream nodes can start before the last page arrives
+            for response in iter_page_responses(client, endpoint, params, max_concurrent=max_concurrent):
+                if raw_output:
+                    envelope = response.list_envelope()
+                    total_count = envelope["totalCount"]
+                    retrieved += self._page_item_count(envelope)
+                    yield self.create_text_message(response.text)
+                else:
+                    page = response.json()
+                    if converter is not None:
+                        page = {**page, "contents": [converter.apply(item) for item in page.get("contents", [])]}
+                    total_count = page.get("totalCount", 0)
+                    retrieved += len(page.get("contents", []))
+                    yield self.create_json_message(page)
+        except PageFetchError as e:
+            if e.response.status_code == 401:
+                yield self.create_text_message("Invalid API key")
+            elif e.response.status_code == 404:
+                yield self.create_text_message("Endpoint not found or service domain is invalid")
+            elif e.response.status_code == 429:
+                yield self.create_text_message("Too many requests. Please try again later")
+            else:
+                yield self.create_text_message(f"HTTP error: {e.response.status_code} (offset: {e.offset})")
+            if not retrieved:
+                return
+
+        yield self.create_text_message(
+            f"Successfully retrieved {retrieved} items from endpoint '{endpoint}' "
+            f"across all pages (total: {total_count} items)"
+        )
+
+    def _page_item_count(self, envelope: dict[str, int]) -> int:
+        """
+        Number of items in a list page, derived from its envelope.
+        """
+        return max(0, min(envelope["limit"], envelope["totalCount"] - envelope["offset"]))
@@ -1,15 +1,32 @@
 from collections.abc import Generator
-from typing import Any
+from typing import Any, Optional
 import requests
-import concurrent.futures
-import threading
 
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
 
+from utils.async_engine import FetchRequest
+from utils.batch import iter_by_ids
+from utils.client import get_client
+from utils.instrumentation import InvocationMetrics, run_instrumented
+from utils.memory import MemoryBudget
+from utils.ordering import iter_in_order
+from utils.output import ContentWriter, item_share
+from utils.pagination import PageFetchError, iter_page_responses, plan_offsets
+from utils.projection import plan_projection, report_projection
+from utils.rate_limit import Deadline, DeadlineExceeded
+from utils.references import ReferenceExpander, parse_reference_fields
+from utils.response import ApiResponse
+from utils.resume import ResumeCursor, decode_cursor, query_fingerprint
+from utils.richtext import RichTextConverter, parse_rich_text_fields
+from utils.sync import diff_snapshot, list_versions, load_snapshot
+
 
 class GetFullContentsTool(Tool):
     def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage]:
+        yield from run_instrumented(self, "get_full_contents", tool_parameters, lambda metrics: self._run(tool_parameters, metrics))
+
+    def _run(self, tool_parameters: dict[str, Any], metrics: InvocationMetrics) -> Generator[ToolInvokeMessage]:
         # Get credentials
         service_domain = self.runtime.credentials.get("service_domain", "").strip()
         api_key = self.runtime.credentials.get("api_key", "").strip()
@@ -28,9 +45,6 @@ class GetFullContentsTool(Tool):
             return
 
         try:
-            # Step 1: Get content list (only IDs)
-            yield self.create_text_message("Step 1: Retrieving content list...")
-
             # Build list parameters
             list_params = {}
 
@@ -63,53 +77,7 @@ class GetFullContentsTool(Tool):
             if filters:
                 list_params["filters"] = filters
 
-            # Only request IDs in list request to minimize data transfer
-            list_params["fields"] = "id"
-
-            # Make list request
-            list_url = f"https://{service_domain}.microcms.io/api/v1/{endpoint}"
-            headers = {"X-MICROCMS-API-KEY": api_key}
-
-            list_response = requests.get(list_url, headers=headers, params=list_params, timeout=30)
-
-            if list_response.status_code == 401:
-                yield self.create_text_message("Invalid API key")
-                return
-            elif list_response.status_code == 404:
-                yield self.create_text_message("Endpoint not found or service domain is invalid")
-                return
-            elif list_response.status_code == 429:
-                yield self.create_text_message("Too many requests. Please try again later")
-                return
-            elif list_response.status_code >= 400:
-                try:
-                    error_data = list_response.json()
-                    error_msg = error_data.get("message", f"HTTP {list_response.status_code}")
-                    yield self.create_text_message(f"API error: {error_msg}")
-                except:
-                    yield self.create_text_message(f"HTTP error: {list_response.status_code}")
-                return
-
-            # Parse list response
-            list_data = list_response.json()
-            content_ids = [item["id"] for item in list_data.get("contents", [])]
-            total_count = list_data.get("totalCount", 0)
-            current_limit = list_data.get("limit", 0)
-            current_offset = list_data.get("offset", 0)
-
-            if not content_ids:
-                yield self.create_text_message("No content found matching the criteria")
-                yield self.create_json_message({
-                    "totalCount": total_count,
-                    "limit": current_limit,
-                    "offset": current_offset,
-                    "contents": []
-                })
-                return
-
-            yield self.create_text_message(f"Found {len(content_ids)} content items. Step 2: Fetching full details...")
-
-            # Step 2: Prepare detail parameters
+            # Build detail parameters
             detail_params = {}
 
             fields = tool_parameters.get("fields", "").strip()
@@ -133,77 +101,518 @@ class GetFullContentsTool(Tool):
             if rich_editor_format:
                 detail_params["richEditorFormat"] = rich_editor_format
 
-            # Step 3: Concurrent detail requests
+            # Handle output paths; they compile into the smallest fields and depth that cover them
+            baseline_params = dict(detail_params)
+            projection = plan_projection(tool_parameters.get("output_paths", ""), fields)
+            if projection:
+                detail_params["fields"] = projection.fields
+                detail_params["depth"] = projection.depth
+
+            # Handle explicit IDs
+            ids = tool_parameters.get("ids", "") or ""
+            requested_ids = list(dict.fromkeys(cid.strip() for cid in ids.split(",") if cid.strip()))
+
+            # Handle fetch mode; a draft key applies to a single content, so it needs per-item requests
+            fetch_mode = tool_parameters.get("fetch_mode", "batch") or "batch"
+            if draft_key and fetch_mode != "incremental":
+                fetch_mode = "detail"
+
             max_concurrent = tool_parameters.get("max_concurrent", 5)
             if max_concurrent is not None:
                 max_concurrent = int(max_concurrent)
                 if max_concurrent < 1:
                     max_concurrent = 1
-                elif max_concurrent > 10:
-                    max_concurrent = 10
-
-            # Thread-safe containers
-            results = []
-            errors = []
-            lock = threading.Lock()
-
-            def fetch_content_detail(content_id: str):
-                try:
-                    detail_url = f"https://{service_domain}.microcms.io/api/v1/{endpoint}/{content_id}"
-                    detail_response = requests.get(detail_url, headers=headers, params=detail_params, timeout=30)
-
-                    if detail_response.status_code == 200:
-                        content_data = detail_response.json()
-                        with lock:
-                            results.append(content_data)
-                    else:
-                        with lock:
-                            errors.append({
-                                "content_id": content_id,
-                                "error": f"HTTP {detail_response.status_code}"
-                            })
-
-                except Exception as e:
-                    with lock:
-                        errors.append({
-                            "content_id": content_id,
-                            "error": str(e)
-                        })
-
-            # Use ThreadPoolExecutor for concurrent requests
-            with concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrent) as executor:
-                # Submit all tasks
-                future_to_id = {executor.submit(fetch_content_detail, cid): cid for cid in content_ids}
-
-                # Wait for all to complete with progress
-                completed = 0
-                for future in concurrent.futures.as_completed(future_to_id):
+                elif max_concurrent > 200:
+                    max_concurrent = 200
+
+            # Handle response cache
+            use_cache = tool_parameters.get("use_cache", True) is not False
+
+            # Handle output mode
+            chunk_size = tool_parameters.get("chunk_size", 10)
+            chunk_size = min(max(int(chunk_size or 10), 1), 100)
+            writer = ContentWriter(
+                self,
+                output_mode=tool_parameters.get("output_mode", "combined") or "combined",
+                chunk_size=chunk_size,
+                include_summary=tool_parameters.get("include_summary", True) is not False,
+                # Bounds the response bytes held at once; dispatch waits and buffered output is sent early
+                memory=MemoryBudget(),
+            )
+
+            # Handle ordering of per-item results
+            preserve_order = tool_parameters.get("preserve_order", True) is not False
+            reorder_window = tool_parameters.get("reorder_window", 50)
+            reorder_window = min(max(int(reorder_window or 50), 1), 1000)
+            window = reorder_window if preserve_order else None
+
+            # Share one time budget across every request of this invocation
+            client = get_client(service_domain, api_key).bind(use_cache=use_cache, deadline=Deadline(), recorder=metrics)
+
+            # Handle resume cursor; work cut off by the time budget is listed in the cursor of the reply
+            all_pages = tool_parameters.get("all_pages", False) and not requested_ids
+            fingerprint = query_fingerprint(endpoint, {
+                **list_params,
+                **baseline_params,
+                "fetch_mode": fetch_mode,
+                "all_pages": bool(all_pages),
+                "ids": ",".join(requested_ids),
+                "output_paths": tool_parameters.get("output_paths", "") or "",
+            })
+            resume_cursor = (tool_parameters.get("resume_cursor", "") or "").strip()
+            cursor = decode_cursor(resume_cursor, endpoint, fingerprint) if resume_cursor else None
+            if cursor is not None and fetch_mode == "incremental":
+                raise ValueError("Incremental fetches resume from the returned snapshot, not a resume cursor")
+            writer.pending = ResumeCursor(endpoint, fingerprint, [], [])
+
+            # Handle reference expansion; content is fetched at depth 0 and each referenced record once
+            reference_mode = tool_parameters.get("reference_mode", "off") or "off"
+            reference_fields = parse_reference_fields(tool_parameters.get("reference_fields", "") or "")
+            if reference_mode != "off" and reference_fields:
+                reference_depth = int(detail_params.get("depth", 1) or 1)
+                writer.expander = ReferenceExpander(client, reference_fields, reference_mode, reference_depth, max_concurrent)
+                detail_params["depth"] = 0
+
+            # Handle rich text conversion; unchanged items reuse their cached conversion
+            rich_text_fields = parse_rich_text_fields(tool_parameters.get("rich_text_fields", "") or "")
+            if rich_text_fields:
+                writer.converter = RichTextConverter(
+                    client.scope,
+                    endpoint,
+                    rich_text_fields,
+                    text_format=tool_parameters.get("rich_text_format", "markdown") or "markdown",
+                    chunk_size=int(tool_parameters.get("rich_text_chunk_size", 0) or 0),
+                    use_cache=use_cache and not draft_key,
+                )
+
+            if cursor is not None:
+                yield from self._fetch_resumed(client, endpoint, list_params, detail_params, cursor, fetch_mode, max_concurrent, window, writer)
+            elif fetch_mode == "incremental":
+                snapshot = load_snapshot(tool_parameters.get("snapshot", ""))
+                yield from self._fetch_incremental(client, endpoint, list_params, detail_params, snapshot, max_concurrent, writer)
+            elif all_pages:
+                yield from self._fetch_all_pages(client, endpoint, list_params, detail_params, fetch_mode, max_concurrent, window, writer)
+            elif fetch_mode == "batch":
+                yield from self._fetch_batch(client, endpoint, list_params, detail_params, requested_ids, writer)
+            else:
+                yield from self._fetch_detail(client, endpoint, list_params, detail_params, requested_ids, max_concurrent, window, writer)
+
+            if writer.converter is not None:
+                metrics.annotate("rich_text", writer.converter.stats())
+            metrics.annotate("memory", writer.memory.stats())
+
+            if projection and writer.count:
+                yield from report_projection(
+                    self, client, endpoint, projection, baseline_params, writer.first_id, writer.count,
+                    metrics if tool_parameters.get("include_metrics", False) else None,
+                )
+
+        except requests.RequestException as e:
+            yield self.create_text_message(f"Network error: {str(e)}")
+        except Exception as e:
+            yield self.create_text_message(f"Error: {str(e)}")
+
+    def _list_error_message(self, list_response: ApiResponse) -> str:
+        if list_response.status_code == 401:
+            return "Invalid API key"
+        elif list_response.status_code == 404:
+            return "Endpoint not found or service domain is invalid"
+        elif list_response.status_code == 429:
+            return "Too many requests. Please try again later"
+        try:
+            error_data = list_response.json()
+            error_msg = error_data.get("message", f"HTTP {list_response.status_code}")
+            return f"API error: {error_msg}"
+        except:
+            return f"HTTP error: {list_response.status_code}"
+
+    def _fetch_batch(
+        self,
+        client,
+        endpoint: str,
+        list_params: dict[str, Any],
+        detail_params: dict[str, Any],
+        requested_ids: list[str],
+        writer: ContentWriter,
+    ) -> Generator[ToolInvokeMessage]:
+        if requested_ids:
+            # Fetch full records by ID, up to 100 per list request
+            yield self.create_text_message(f"Fetching {len(requested_ids)} content items in batches...")
+            remaining_ids = yield from self._fetch_batches(client, endpoint, requested_ids, detail_params, writer)
+            writer.pending.ids.extend(remaining_ids)
+            total_count = len(requested_ids)
+            current_limit = len(requested_ids)
+            current_offset = 0
+        else:
+            # The list request can return full records directly, so no ID pass is needed
+            yield self.create_text_message("Retrieving full content list...")
+            list_response = client.get(endpoint, params={**list_params, **detail_params})
+            if list_response.status_code >= 400:
+                yield self.create_text_message(self._list_error_message(list_response))
+                return
+
+            list_data = list_response.json()
+            contents = list_data.get("contents", [])
+            size = item_share(list_response.content, contents)
+            for item in contents:
+                yield from writer.add(item, size=size)
+            total_count = list_data.get("totalCount", 0)
+            current_limit = list_data.get("limit", 0)
+            current_offset = list_data.get("offset", 0)
+
+        yield from self._yield_results(endpoint, writer, total_count, current_limit, current_offset)
+
+    def _fetch_detail(
+        self,
+        client,
+        endpoint: str,
+        list_params: dict[str, Any],
+        detail_params: dict[str, Any],
+        requested_ids: list[str],
+        max_concurrent: int,
+        window: Optional[int],
+        writer: ContentWriter,
+    ) -> Generator[ToolInvokeMessage]:
+        if requested_ids:
+            content_ids = list(dict.fromkeys(requested_ids))
+            total_count = len(content_ids)
+            current_limit = len(content_ids)
+            current_offset = 0
+        else:
+            # Step 1: Get content list (only IDs)
+            yield self.create_text_message("Step 1: Retrieving content list...")
+
+            # Only request IDs in list request to minimize data transfer
+            list_response = client.get(endpoint, params={**list_params, "fields": "id"})
+            if list_response.status_code >= 400:
+                yield self.create_text_message(self._list_error_message(list_response))
+                return
+
+            # Parse list response
+            list_data = list_response.json()
+            content_ids = list(dict.fromkeys(item["id"] for item in list_data.get("contents", [])))
+            total_count = list_data.get("totalCount", 0)
+            current_limit = list_data.get("limit", 0)
+            current_offset = list_data.get("offset", 0)
+
+        if content_ids:
+            yield self.create_text_message(f"Found {len(content_ids)} content items. Step 2: Fetching full details...")
+
+            # Step 2: Concurrent detail requests
+            remaining_ids = yield from self._fetch_details(
+                client, endpoint, content_ids, detail_params, max_concurrent, window, writer
+            )
+            writer.pending.ids.extend(remaining_ids)
+
+        yield from self._yield_results(endpoint, writer, total_count, current_limit, current_offset)
+
+    def _fetch_incremental(
+        self,
+        client,
+        endpoint: str,
+        list_params: dict[str, Any],
+        detail_params: dict[str, Any],
+        snapshot: dict[str, str],
+        max_concurrent: int,
+        writer: ContentWriter,
+    ) -> Generator[ToolInvokeMessage]:
+        # Step 1: List every record with only its version fields
+        yield self.create_text_message("Step 1: Comparing content versions with the snapshot...")
+        try:
+            versions = list_versions(client, endpoint, list_params, max_concurrent=max_concurrent)
+        except PageFetchError as e:
+            yield self.create_text_message(self._list_error_message(e.response))
+            return
+
+        created, updated, deleted = diff_snapshot(snapshot, versions)
+        changed_ids = created + updated
+
+        # Step 2: Fetch full records only for new or changed content
+        fetched_ids: set[str] = set()
+        if changed_ids:
+            yield self.create_text_message(
+                f"Found {len(created)} new and {len(updated)} updated items. Step 2: Fetching full details..."
+            )
+            # A draft key does not apply to published snapshots
+            sync_params = {k: v for k, v in detail_params.items() if k != "draftKey"}
+            for contents, errors, body_size in iter_by_ids(
+                client, endpoint, changed_ids, sync_params, use_cache=False, deadline=client.deadline
+            ):
+                for item in contents:
+                    fetched_ids.add(item.get("id"))
+                    yield from writer.add(item, size=body_size // len(contents))
+                for error in errors:
+                    fetched_ids.add(error["content_id"])
+                    writer.add_error(error["content_id"], error["error"])
+
+        # Items the time budget did not reach are left like failed ones, so the next run with
+        # the returned snapshot picks them up
+        unfinished_ids = [cid for cid in changed_ids if cid not in fetched_ids]
+        if unfinished_ids:
+            yield self.create_text_message(
+                f"Time budget nearly used up: {len(unfinished_ids)} changed items were not fetched. "
+                f"Call again with the returned snapshot to fetch them"
+            )
+
+        # Keep the previous version of failed items so they are retried on the next run
+        failed_ids = {error["content_id"] for error in writer.errors}
+        failed_ids.update(unfinished_ids)
+        next_snapshot = {
+            cid: (snapshot[cid] if cid in failed_ids and cid in snapshot else version)
+            for cid, version in versions.items()
+            if cid not in failed_ids or cid in snapshot
+        }
+
+        yield self.create_text_message(
+            f"Completed! {writer.count} changed items retrieved, {len(deleted)} deleted, "
+            f"{len(versions) - len(changed_ids)} unchanged in endpoint '{endpoint}'"
+        )
+        if writer.errors:
+            yield self.create_text_message(f"Warning: {len(writer.errors)} items failed to retrieve")
+
+        yield from writer.finish({
+            "totalCount": len(versions),
+            "created": created,
+            "updated": updated,
+            "deleted": deleted,
+            "snapshot": next_snapshot,
+        })
+
+    def _fetch_all_pages(
+        self,
+        client,
+        endpoint: str,
+        list_params: dict[str, Any],
+        detail_params: dict[str, Any],
+        fetch_mode: str,
+        max_concurrent: int,
+        window: Optional[int],
+        writer: ContentWriter,
+        offsets: Optional[list[int]] = None,
+    ) -> Generator[ToolInvokeMessage]:
+        if offsets is None:
+            yield self.create_text_message("Retrieving all pages...")
+        else:
+            yield self.create_text_message(f"Retrieving {len(offsets)} remaining pages...")
+
+        if fetch_mode == "batch":
+            page_params = {**list_params, **detail_params}
+        else:
+            page_params = {**list_params, "fields": "id"}
+
+        total_count = 0
+        deadline = client.deadline
+        # Offsets still to fetch; without explicit offsets the first page plans them
+        planned = list(offsets or [])
+        fetched_offsets: set[int] = set()
+        # Items shift between pages when content is published mid-run, so the same ID can show up twice
+        seen_ids: set[str] = set()
+        try:
+            # Each page is yielded as soon as it is complete to keep memory flat
+            responses = iter_page_responses(
+                client, endpoint, page_params, max_concurrent=min(max_concurrent, 10), offsets=offsets
+            )
+            if deadline is not None and deadline.winding_down():
+                responses = iter(())
+            for response in responses:
+                page = response.json()
+                total_count = page.get("totalCount", 0)
+                page_offset = page.get("offset", 0)
+                if offsets is None and not fetched_offsets:
+                    planned = [page_offset] + plan_offsets(total_count, page_offset)
+                fetched_offsets.add(page_offset)
+                contents = [item for item in page.get("contents", []) if item.get("id") not in seen_ids]
+                seen_ids.update(item.get("id") for item in contents)
+
+                # Per-page writer so combined output stays one message per page
+                page_writer = writer if writer.streaming else ContentWriter(
+                    self, expander=writer.expander, converter=writer.converter, memory=writer.memory
+                )
+                if fetch_mode == "batch":
+                    size = item_share(response.content, contents)
+                    for item in contents:
+                        yield from page_writer.add(item, size=size)
+                else:
+                    content_ids = [item["id"] for item in contents]
+                    remaining_ids = yield from self._fetch_details(
+                        client, endpoint, content_ids, detail_params, max_concurrent, window, page_writer
+                    )
+                    writer.pending.ids.extend(remaining_ids)
+
+                if not writer.streaming:
+                    writer.count += page_writer.count
+                    writer.errors.extend(page_writer.errors)
+                    yield from page_writer.finish({
+                        "totalCount": total_count,
+                        "limit": page.get("limit", 0),
+                        "offset": page.get("offset", 0),
+                    })
+                yield self.create_text_message(f"Progress: {writer.count}/{total_count} items fetched...")
+
+                # Stop starting pages near the deadline; the rest go into the resume cursor
+                if deadline is not None and deadline.winding_down():
+                    break
+        except PageFetchError as e:
+            yield self.create_text_message(self._list_error_message(e.response))
+            if not writer.count:
+                return
+        except requests.Timeout:
+            if deadline is None or not deadline.winding_down() or not planned:
+                raise
+        writer.pending.offsets.extend(offset for offset in planned if offset not in fetched_offsets)
+
+        if writer.interrupted:
+            yield self._resume_notice(writer)
+        else:
+            yield self.create_text_message(
+                f"Completed! Retrieved {writer.count} full content details from endpoint '{endpoint}' "
+                f"(total available: {total_count})"
+            )
+        if writer.errors:
+            yield self.create_text_message(f"Warning: {len(writer.errors)} items failed to retrieve")
+        if writer.streaming:
+            yield from writer.finish({"totalCount": total_count})
+        else:
+            yield from writer.finish_resume()
+
+    def _fetch_details(
+        self,
+        client,
+        endpoint: str,
+        content_ids: list[str],
+        detail_params: dict[str, Any],
+        max_concurrent: int,
+        window: Optional[int],
+        writer: ContentWriter,
+    ) -> Generator[ToolInvokeMessage, None, list[str]]:
+        """
+        Fetch each item with its own detail request; returns the IDs the time budget did not allow for.
+        """
+        # Requests run on the shared async engine; closing the stream cancels whatever is still in flight
+        fetch_requests = [FetchRequest(endpoint, cid, detail_params) for cid in content_ids]
+        with client.stream(fetch_requests, max_in_flight=max_concurrent, window=window, memory=writer.memory) as stream:
+            # With a window, results come out in content_ids order and at most `window` are buffered
+            results = iter_in_order(stream) if window else stream
+            completed = 0
+            handled: set[int] = set()
+            try:
+                for result in results:
                     completed += 1
+                    if result.error is not None:
+                        writer.add_error(result.request.content_id, result.error)
+                    elif result.response.status_code == 200:
+                        # Each item is handed to the writer as soon as it arrives
+                        yield from writer.add(result.response.json(), size=result.size)
+                    else:
+                        writer.add_error(result.request.content_id, f"HTTP {result.response.status_code}")
+                    handled.add(result.index)
+
                     if completed % 5 == 0 or completed == len(content_ids):
                         yield self.create_text_message(f"Progress: {completed}/{len(content_ids)} items fetched...")
+            except DeadlineExceeded:
+                # Requests that stalled past the deadline; keep what arrived and leave the rest for the cursor
+                return [cid for index, cid in enumerate(content_ids) if index not in handled]
+        return [request.content_id for _, request in stream.unfinished]
+
+    def _fetch_batches(
+        self,
+        client,
+        endpoint: str,
+        content_ids: list[str],
+        detail_params: dict[str, Any],
+        writer: ContentWriter,
+    ) -> Generator[ToolInvokeMessage, None, list[str]]:
+        """
+        Fetch items 100 IDs per list request; returns the IDs the time budget did not allow for.
+        """
+        fetched_ids: set[str] = set()
+        for contents, errors, body_size in iter_by_ids(client, endpoint, content_ids, detail_params, deadline=client.deadline):
+            for item in contents:
+                fetched_ids.add(item.get("id"))
+                yield from writer.add(item, size=body_size // len(contents))
+            for error in errors:
+                fetched_ids.add(error["content_id"])
+                writer.add_error(error["content_id"], error["error"])
+        return [cid for cid in content_ids if cid not in fetched_ids]
+
+    def _fetch_resumed(
+        self,
+        client,
+        endpoint: str,
+        list_params: dict[str, Any],
+        detail_params: dict[str, Any],
+        cursor: ResumeCursor,
+        fetch_mode: str,
+        max_concurrent: int,
+        window: Optional[int],
+        writer: ContentWriter,
+    ) -> Generator[ToolInvokeMessage]:
+        yield self.create_text_message(
+            f"Resuming: {len(cursor.ids)} items and {len(cursor.offsets)} pages left by the previous call..."
+        )
+
+        if cursor.ids:
+            # In combined output the resumed items are their own message when pages follow
+            ids_writer = writer
+            if cursor.offsets and not writer.streaming:
+                ids_writer = ContentWriter(
+                    self, expander=writer.expander, converter=writer.converter, memory=writer.memory
+                )
+            if fetch_mode == "batch":
+                remaining_ids = yield from self._fetch_batches(client, endpoint, cursor.ids, detail_params, ids_writer)
+            else:
+                remaining_ids = yield from self._fetch_details(
+                    client, endpoint, cursor.ids, detail_params, max_concurrent, window, ids_writer
+                )
+            writer.pending.ids.extend(remaining_ids)
+
+            if ids_writer is not writer:
+                writer.count += ids_writer.count
+                writer.errors.extend(ids_writer.errors)
+                yield from ids_writer.finish({"totalCount": len(cursor.ids)})
+
+        if cursor.offsets:
+            yield from self._fetch_all_pages(
+                client, endpoint, list_params, detail_params, fetch_mode, max_concurrent, window, writer, cursor.offsets
+            )
+        else:
+            yield from self._yield_results(endpoint, writer, len(cursor.ids), len(cursor.ids), 0)
+
+    def _resume_notice(self, writer: ContentWriter) -> ToolInvokeMessage:
+        return self.create_text_message(
+            f"Time budget nearly used up: returning {writer.count} items. {len(writer.pending.ids)} items and "
+            f"{len(writer.pending.offsets)} pages remain; call again with the same parameters and resume_cursor to continue"
+        )
+
+    def _yield_results(
+        self,
+        endpoint: str,
+        writer: ContentWriter,
+        total_count: int,
+        current_limit: int,
+        current_offset: int,
+    ) -> Generator[ToolInvokeMessage]:
+        summary = {
+            "totalCount": total_count,
+            "limit": current_limit,
+            "offset": current_offset,
+        }
+
+        if not writer.count and not writer.errors and not writer.interrupted:
+            yield self.create_text_message("No content found matching the criteria")
+            yield from writer.finish(summary)
+            return
 
-            # Step 4: Combine and return results
+        # Combine and return results
+        if writer.interrupted:
+            yield self._resume_notice(writer)
+        else:
             yield self.create_text_message(
-                f"Completed! Retrieved {len(results)} full content details from endpoint '{endpoint}' "
+                f"Completed! Retrieved {writer.count} full content details from endpoint '{endpoint}' "
                 f"(total available: {total_count})"
             )
 
-            # Prepare final response
-            final_response = {
-                "totalCount": total_count,
-                "limit": current_limit,
-                "offset": current_offset,
-                "contents": results
-            }
+        if writer.errors:
+            yield self.create_text_message(f"Warning: {len(writer.errors)} items failed to retrieve")
 
-            # Add errors if any
-            if errors:
-                final_response["errors"] = errors
-                yield self.create_text_message(f"Warning: {len(errors)} items failed to retrieve")
-
-            yield self.create_json_message(final_response)
-
-        except requests.RequestException as e:
-            yield self.create_text_message(f"Network error: {str(e)}")
-        except Exception as e:
-            yield self.create_text_message(f"Error: {str(e)}")
\ No newline at end of file
+        yield from writer.finish(summary)
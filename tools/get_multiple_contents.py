@@ -0,0 +1,175 @@
+from collections.abc import Generator
+from typing import Any
+import requests
+
+from dify_plugin import Tool
+from dify_plugin.entities.tool import ToolInvokeMessage
+
+from utils import codec
+from utils.async_engine import FetchRequest
+from utils.client import get_client
+from utils.instrumentation import InvocationMetrics, run_instrumented
+from utils.rate_limit import Deadline, DeadlineExceeded
+
+# Upper bound on queries per invocation
+MAX_QUERIES = 50
+
+# Query parameters accepted in a spec, and whether they are integers
+QUERY_PARAMS = {
+    "limit": True,
+    "offset": True,
+    "depth": True,
+    "orders": False,
+    "q": False,
+    "filters": False,
+    "fields": False,
+    "ids": False,
+    "draftKey": False,
+    "richEditorFormat": False,
+}
+
+# Ranges integer parameters are clamped to, as in the other tools
+PARAM_RANGES = {
+    "limit": (1, 100),
+    "offset": (0, None),
+    "depth": (0, 3),
+}
+
+
+class GetMultipleContentsTool(Tool):
+    def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage]:
+        yield from run_instrumented(self, "get_multiple_contents", tool_parameters, lambda metrics: self._run(tool_parameters, metrics))
+
+    def _run(self, tool_parameters: dict[str, Any], metrics: InvocationMetrics) -> Generator[ToolInvokeMessage]:
+        # Get credentials
+        service_domain = self.runtime.credentials.get("service_domain", "").strip()
+        api_key = self.runtime.credentials.get("api_key", "").strip()
+
+        if not service_domain:
+            yield self.create_text_message("Service domain is required")
+            return
+        if not api_key:
+            yield self.create_text_message("API key is required")
+            return
+
+        # Get required parameters
+        queries = (tool_parameters.get("queries", "") or "").strip()
+        if not queries:
+            yield self.create_text_message("Queries are required")
+            return
+
+        try:
+            names, fetch_requests = self._parse_queries(queries)
+
+            max_concurrent = tool_parameters.get("max_concurrent", 5)
+            max_concurrent = min(max(int(max_concurrent or 5), 1), MAX_QUERIES)
+
+            # Handle response cache
+            use_cache = tool_parameters.get("use_cache", True) is not False
+
+            # Every query shares the connections and rate limit of this service domain
+            client = get_client(service_domain, api_key).bind(use_cache=use_cache, deadline=Deadline(), recorder=metrics)
+
+            results: dict[str, Any] = {}
+            errors = []
+            handled: set[int] = set()
+            with client.stream(fetch_requests, max_in_flight=max_concurrent) as stream:
+                try:
+                    for result in stream:
+                        handled.add(result.index)
+                        name = names[result.index]
+                        if result.error is not None:
+                            errors.append({"name": name, "endpoint": result.request.endpoint, "error": result.error})
+                        elif result.response.status_code == 200:
+                            results[name] = result.response.json()
+                        else:
+                            errors.append({
+                                "name": name,
+                                "endpoint": result.request.endpoint,
+                                "error": f"HTTP {result.response.status_code}",
+                            })
+                except DeadlineExceeded:
+                    # Requests stalled past the deadline; the queries already fetched are still returned
+                    pass
+
+            # Queries the time budget did not allow for are reported rather than dropped
+            for index, fetch_request in enumerate(fetch_requests):
+                if index not in handled:
+                    errors.append({"name": names[index], "endpoint": fetch_request.endpoint, "error": "Deadline reached"})
+
+            # Keep results in the order the queries were given
+            response = {"results": {name: results[name] for name in names if name in results}}
+            if errors:
+                response["errors"] = errors
+
+            yield self.create_text_message(
+                f"Fetched {len(results)} of {len(names)} queries: "
+                + ", ".join(self._describe(name, results[name]) for name in names if name in results)
+            )
+            if errors:
+                yield self.create_text_message(f"Warning: {len(errors)} queries failed")
+            yield self.create_json_message(response)
+
+        except requests.RequestException as e:
+            yield self.create_text_message(f"Network error: {str(e)}")
+        except Exception as e:
+            yield self.create_text_message(f"Error: {str(e)}")
+
+    def _parse_queries(self, queries: str) -> tuple[list[str], list[FetchRequest]]:
+        """
+        Parse a JSON array of query specs, or a comma-separated list of endpoints.
+
+        A spec is `{"endpoint": "news", "name": "latest", "content_id": "...",
+        "limit": 5, "filters": "...", ...}`; `name` defaults to the endpoint and
+        repeated names get a numeric suffix.
+        """
+        if queries.startswith("["):
+            specs = codec.loads(queries)
+        else:
+            specs = [{"endpoint": endpoint.strip()} for endpoint in queries.split(",") if endpoint.strip()]
+        if not isinstance(specs, list) or not specs:
+            raise ValueError("Queries must be a non-empty JSON array of query specs")
+        if len(specs) > MAX_QUERIES:
+            raise ValueError(f"At most {MAX_QUERIES} queries are allowed per call")
+
+        names: list[str] = []
+        fetch_requests = []
+        for spec in specs:
+            if isinstance(spec, str):
+                spec = {"endpoint": spec}
+            if not isinstance(spec, dict) or not str(spec.get("endpoint", "")).strip():
+                raise ValueError(f"Each query needs an endpoint: {spec}")
+
+            endpoint = str(spec["endpoint"]).strip()
+            content_id = str(spec.get("content_id", "") or "").strip() or None
+            params = {}
+            for key, is_int in QUERY_PARAMS.items():
+                value = spec.get(key)
+                if value is None or value == "":
+                    continue
+                if not is_int:
+                    params[key] = str(value)
+                    continue
+                value = int(value)
+                low, high = PARAM_RANGES.get(key, (None, None))
+                if low is not None and value < low:
+                    value = low
+                elif high is not None and value > high:
+                    value = high
+                params[key] = value
+
+            name = str(spec.get("name", "") or "").strip() or (f"{endpoint}/{content_id}" if content_id else endpoint)
+            if name in names:
+                suffix = 2
+                while f"{name}_{suffix}" in names:
+                    suffix += 1
+                name = f"{name}_{suffix}"
+
+            names.append(name)
+            fetch_requests.append(FetchRequest(endpoint, content_id, params))
+        return names, fetch_requests
+
+    def _describe(self, name: str, data: Any) -> str:
+        if isinstance(data, dict) and "contents" in data:
+            return f"{name} ({len(data['contents'])} of {data.get('totalCount', 0)} items)"
+        return f"{name} (1 item)"
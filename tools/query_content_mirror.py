@@ -0,0 +1,111 @@
+from collections.abc import Generator
+from typing import Any
+import time
+import requests
+
+from dify_plugin import Tool
+from dify_plugin.entities.tool import ToolInvokeMessage
+
+from utils import config
+from utils.client import get_client
+from utils.instrumentation import InvocationMetrics, run_instrumented
+from utils.mirror import get_store, sync_mirror
+from utils.pagination import PageFetchError
+from utils.projection import parse_paths, select_paths
+from utils.rate_limit import Deadline
+
+
+class QueryContentMirrorTool(Tool):
+    def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage]:
+        yield from run_instrumented(self, "query_content_mirror", tool_parameters, lambda metrics: self._run(tool_parameters, metrics))
+
+    def _run(self, tool_parameters: dict[str, Any], metrics: InvocationMetrics) -> Generator[ToolInvokeMessage]:
+        # Get credentials
+        service_domain = self.runtime.credentials.get("service_domain", "").strip()
+        api_key = self.runtime.credentials.get("api_key", "").strip()
+
+        if not service_domain:
+            yield self.create_text_message("Service domain is required")
+            return
+        if not api_key:
+            yield self.create_text_message("API key is required")
+            return
+
+        # Get required parameters
+        endpoint = tool_parameters.get("endpoint", "").strip()
+        if not endpoint:
+            yield self.create_text_message("Endpoint is required")
+            return
+
+        try:
+            # Handle pagination
+            limit = tool_parameters.get("limit", 10)
+            limit = min(max(int(limit if limit is not None else 10), 1), 100)
+
+            offset = tool_parameters.get("offset", 0)
+            offset = max(int(offset or 0), 0)
+
+            # Handle sorting, searching and filtering
+            orders = (tool_parameters.get("orders", "") or "").strip()
+            q = (tool_parameters.get("q", "") or "").strip()
+            filters = (tool_parameters.get("filters", "") or "").strip()
+
+            # Handle fields
+            fields = parse_paths(tool_parameters.get("fields", "") or "")
+
+            # Handle freshness; an older or missing mirror is synced before answering
+            max_age = tool_parameters.get("max_age")
+            max_age = config.MIRROR_MAX_AGE if max_age is None else max(float(max_age), 0.0)
+
+            client = get_client(service_domain, api_key).bind(deadline=Deadline(), recorder=metrics)
+            store = get_store(client)
+
+            info = store.info(endpoint)
+            if info is None or time.time() - info.synced_at > max_age:
+                yield self.create_text_message(f"Local mirror of endpoint '{endpoint}' is missing or stale, syncing...")
+                result, info = sync_mirror(store, client, endpoint)
+                if result.complete:
+                    yield self.create_text_message(
+                        f"Mirror synced ({result.mode} sync: {result.fetched} fetched, {result.deleted} deleted)"
+                    )
+                elif info is None:
+                    # The first sync keeps its progress; later calls continue it instead of starting over
+                    yield self.create_text_message(
+                        f"Time budget reached while building the mirror of endpoint '{endpoint}' "
+                        f"({result.fetched} fetched so far); call again to continue"
+                    )
+                    return
+                else:
+                    yield self.create_text_message(
+                        f"Time budget reached while syncing ({result.fetched} fetched so far); "
+                        "answering from the previous sync, call again to finish it"
+                    )
+
+            contents, total_count = store.query(endpoint, filters=filters, orders=orders, q=q, limit=limit, offset=offset)
+            if fields:
+                contents = [select_paths(item, fields) for item in contents]
+
+            freshness = info.freshness()
+            yield self.create_text_message(
+                f"Retrieved {len(contents)} items from the local mirror of endpoint '{endpoint}' "
+                f"(total: {total_count} items, synced {freshness['ageSeconds']}s ago)"
+            )
+            yield self.create_json_message({
+                "contents": contents,
+                "totalCount": total_count,
+                "limit": limit,
+                "offset": offset,
+                "mirror": freshness,
+            })
+
+        except PageFetchError as e:
+            if e.response.status_code == 401:
+                yield self.create_text_message("Invalid API key")
+            elif e.response.status_code == 404:
+                yield self.create_text_message("Endpoint not found or service domain is invalid")
+            else:
+                yield self.create_text_message(f"HTTP error: {e.response.status_code} (offset: {e.offset})")
+        except requests.RequestException as e:
+            yield self.create_text_message(f"Network error: {str(e)}")
+        except Exception as e:
+            yield self.create_text_message(f"Error: {str(e)}")
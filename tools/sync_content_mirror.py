@@ -0,0 +1,107 @@
+from collections.abc import Generator
+from typing import Any
+import requests
+
+from dify_plugin import Tool
+from dify_plugin.entities.tool import ToolInvokeMessage
+
+from utils.client import get_client
+from utils.instrumentation import InvocationMetrics, run_instrumented
+from utils.mirror import get_store, sync_mirror
+from utils.pagination import PageFetchError
+from utils.rate_limit import Deadline
+
+
+class SyncContentMirrorTool(Tool):
+    def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage]:
+        yield from run_instrumented(self, "sync_content_mirror", tool_parameters, lambda metrics: self._run(tool_parameters, metrics))
+
+    def _run(self, tool_parameters: dict[str, Any], metrics: InvocationMetrics) -> Generator[ToolInvokeMessage]:
+        # Get credentials
+        service_domain = self.runtime.credentials.get("service_domain", "").strip()
+        api_key = self.runtime.credentials.get("api_key", "").strip()
+
+        if not service_domain:
+            yield self.create_text_message("Service domain is required")
+            return
+        if not api_key:
+            yield self.create_text_message("API key is required")
+            return
+
+        # Get required parameters
+        endpoint = tool_parameters.get("endpoint", "").strip()
+        if not endpoint:
+            yield self.create_text_message("Endpoint is required")
+            return
+
+        try:
+            # Build parameters of the mirrored records
+            params = {}
+
+            # Handle depth
+            depth = tool_parameters.get("depth", 1)
+            if depth is not None:
+                depth = int(depth)
+                if depth < 1:
+                    depth = 1
+                elif depth > 3:
+                    depth = 3
+                params["depth"] = depth
+
+            # Handle rich editor format
+            rich_editor_format = tool_parameters.get("richEditorFormat", "object")
+            if rich_editor_format:
+                params["richEditorFormat"] = rich_editor_format
+
+            # Handle indexed fields
+            index_fields = tool_parameters.get("index_fields", "") or ""
+            index_fields = [field.strip() for field in index_fields.split(",") if field.strip()]
+
+            max_concurrent = tool_parameters.get("max_concurrent", 5)
+            max_concurrent = min(max(int(max_concurrent or 5), 1), 10)
+
+            full_resync = tool_parameters.get("full_resync", False) is True
+
+            client = get_client(service_domain, api_key).bind(deadline=Deadline(), recorder=metrics)
+            store = get_store(client)
+
+            yield self.create_text_message(f"Syncing the local mirror of endpoint '{endpoint}'...")
+            result, info = sync_mirror(store, client, endpoint, params, index_fields, max_concurrent, full=full_resync)
+
+            if result.complete:
+                yield self.create_text_message(
+                    f"Mirror of endpoint '{endpoint}' is up to date ({result.mode} sync: "
+                    f"{result.fetched} fetched, {result.deleted} deleted, {info.total_count} stored)"
+                )
+            else:
+                # Progress is kept; the next call continues where this one stopped
+                yield self.create_text_message(
+                    f"Time budget reached while syncing endpoint '{endpoint}' ({result.mode} sync: "
+                    f"{result.fetched} fetched, {result.deleted} deleted so far); call again to continue"
+                )
+            if result.failed:
+                yield self.create_text_message(f"Warning: {len(result.failed)} items failed to sync")
+
+            response = {
+                "mode": result.mode,
+                "complete": result.complete,
+                "fetched": result.fetched,
+                "deleted": result.deleted,
+                "indexFields": info.index_fields if info else index_fields,
+                "mirror": info.freshness() if info else None,
+            }
+            if result.failed:
+                response["errors"] = result.failed
+            yield self.create_json_message(response)
+
+        except PageFetchError as e:
+            if e.response.status_code == 401:
+                yield self.create_text_message("Invalid API key")
+            elif e.response.status_code == 404:
+                yield self.create_text_message("Endpoint not found or service domain is invalid")
+            else:
+                yield self.create_text_message(f"HTTP error: {e.response.status_code} (offset: {e.offset})")
+        except requests.RequestException as e:
+            yield self.create_text_message(f"Network error: {str(e)}")
+        except Exception as e:
+            yield self.create_text_message(f"Error: {str(e)}")
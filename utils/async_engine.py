@@ -0,0 +1,538 @@
+import asyncio
+import importlib.util
+import queue
+import sys
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from typing import TYPE_CHECKING, Any, NamedTuple, Optional
+
+import httpx
+
+# httpx loads httpcore on first use, and httpcore probes for trio, tolerating only ImportError.
+# Under the plugin's gevent monkey-patching an installed trio fails with AttributeError
+# (the patched `select` has no epoll), so load httpcore now with trio hidden; the engine runs on asyncio
+try:
+    import httpcore  # noqa: F401
+except AttributeError:
+    sys.modules["trio"] = None
+    import httpcore  # noqa: F401
+
+from utils import config
+from utils.cache import request_key, response_cache
+from utils.instrumentation import InvocationMetrics, RequestMetrics
+from utils.memory import MemoryBudget
+from utils.rate_limit import (
+    RETRYABLE_STATUS_CODES,
+    AdaptiveConcurrency,
+    Deadline,
+    DeadlineExceeded,
+    backoff_delay,
+    parse_retry_after,
+)
+from utils.response import ApiResponse
+
+if TYPE_CHECKING:
+    from utils.client import MicrocmsClient
+
+# HTTP/2 multiplexing needs the optional `h2` package (httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Extra time the consumer waits past the deadline for in-flight requests to report
+DEADLINE_GRACE_SECONDS = 1.0
+
+_DONE = object()
+
+
+class FetchRequest(NamedTuple):
+    endpoint: str
+    content_id: Optional[str] = None
+    params: Optional[dict[str, Any]] = None
+
+
+class FetchResult(NamedTuple):
+    index: int
+    request: FetchRequest
+    response: Optional[ApiResponse]
+    error: Optional[str]
+
+    @property
+    def size(self) -> int:
+        """
+        Body size in bytes, as charged to a stream's memory budget.
+        """
+        return 0 if self.response is None else len(self.response.content)
+
+
+class _LoopThread:
+    """
+    Event loop running in a background thread for the lifetime of the process,
+    so async HTTP connections survive across tool invocations.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="microcms-async", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def submit(self, coro) -> "asyncio.Future":
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+
+_loop_thread = _LoopThread()
+
+
+class _AsyncGate:
+    """
+    Admits a stream's requests while it is below its own cap and a slot of
+    the domain's shared AIMD limit is free, so concurrent invocations and the
+    sync client share one limit. Only used from the event loop thread.
+    """
+
+    def __init__(self, limit: int, shared: AdaptiveConcurrency):
+        self.limit = limit
+        self.shared = shared
+        self._in_flight = 0
+        self._slot_free = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self.shared.add_listener(self._shared_released)
+
+    async def acquire(self) -> None:
+        while True:
+            self._slot_free.clear()
+            if self._in_flight < self.limit and self.shared.try_acquire():
+                break
+            await self._slot_free.wait()
+        self._in_flight += 1
+
+    def release(self) -> None:
+        self._in_flight -= 1
+        self.shared.release()
+        self._slot_free.set()
+
+    def close(self) -> None:
+        self.shared.remove_listener(self._shared_released)
+
+    def _shared_released(self) -> None:
+        # Slots are released by sync clients on other threads too
+        self._loop.call_soon_threadsafe(self._slot_free.set)
+
+
+class FetchStream:
+    """
+    Iterates over fetch results in completion order while requests run on the
+    shared event loop. Closing the stream cancels everything still in flight.
+
+    Once the deadline is winding down no further requests are dispatched;
+    those, and requests cut short by the deadline, yield no result and are
+    listed in `unfinished` as (index, request) once iteration ends.
+
+    With a memory budget, dispatch also waits while the bytes in flight and
+    not yet consumed would exceed it. A result's bytes are released as it is
+    handed to the consumer, which charges `result.size` itself if it keeps
+    the result.
+    """
+
+    def __init__(
+        self,
+        engine: "AsyncFetchEngine",
+        requests: Iterable[FetchRequest],
+        max_in_flight: int,
+        deadline: Optional[Deadline],
+        use_cache: bool,
+        window: Optional[int] = None,
+        recorder: Optional[InvocationMetrics] = None,
+        memory: Optional[MemoryBudget] = None,
+    ):
+        self._engine = engine
+        self._recorder = recorder
+        self._requests = requests
+        self._deadline = deadline
+        self._use_cache = use_cache
+        self._max_in_flight = max_in_flight
+        self._results: queue.Queue = queue.Queue()
+        # Credits bound how many results may be dispatched but not yet released by the consumer
+        self._window = window
+        self._credits = window or 0
+        self._credit_available: Optional[asyncio.Event] = None
+        self._memory = memory
+        self._memory_available: Optional[asyncio.Event] = None
+        # Requests of this stream still running; only touched from the loop thread
+        self._active = 0
+        self.unfinished: list[tuple[int, FetchRequest]] = []
+        self._future = _loop_thread.submit(self._run())
+
+    def __enter__(self) -> "FetchStream":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __iter__(self) -> Iterator[FetchResult]:
+        while True:
+            timeout = None if self._deadline is None else self._deadline.remaining() + DEADLINE_GRACE_SECONDS
+            try:
+                item = self._results.get(timeout=timeout)
+            except queue.Empty:
+                self.close()
+                raise DeadlineExceeded("Time budget exhausted while waiting for responses")
+            if item is _DONE:
+                return
+            self._release_memory(item.size)
+            yield item
+
+    def close(self) -> None:
+        self._future.cancel()
+        # Results nobody will consume no longer count against the budget
+        while True:
+            try:
+                item = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if item is _DONE:
+                self._results.put(_DONE)
+                break
+            self._release_memory(item.size)
+
+    def _release_memory(self, nbytes: int) -> None:
+        if self._memory is not None:
+            self._memory.release(nbytes)
+
+    def release(self, count: int = 1) -> None:
+        """
+        Return window credits once the consumer has emitted results.
+        No-op unless the stream was opened with a window.
+        """
+        if self._window:
+            _loop_thread.loop.call_soon_threadsafe(self._add_credits, count)
+
+    def _add_credits(self, count: int) -> None:
+        self._credits += count
+        if self._credit_available is not None:
+            self._credit_available.set()
+
+    async def _acquire_credit(self) -> bool:
+        """
+        Take a window credit; returns False if the deadline starts winding down
+        first, since a stalled result at the head of the window may never free one.
+        """
+        if not self._window:
+            return True
+        if self._credit_available is None:
+            self._credit_available = asyncio.Event()
+        while self._credits <= 0:
+            self._credit_available.clear()
+            if self._deadline is None:
+                await self._credit_available.wait()
+                continue
+            if self._deadline.winding_down():
+                return False
+            try:
+                await asyncio.wait_for(
+                    self._credit_available.wait(), self._deadline.remaining() - self._deadline.reserve
+                )
+            except asyncio.TimeoutError:
+                pass
+        self._credits -= 1
+        return True
+
+    def _memory_released(self) -> None:
+        _loop_thread.loop.call_soon_threadsafe(self._memory_available.set)
+
+    async def _reserve_memory(self) -> int:
+        """
+        Wait for room for one more response and charge its estimate. A stream
+        with nothing running or waiting to be consumed always dispatches, so
+        output buffered elsewhere cannot stall it.
+        """
+        memory = self._memory
+        if memory is None:
+            return 0
+        if not memory.has_room(memory.estimate()):
+            memory.defer()
+            while True:
+                self._memory_available.clear()
+                if memory.has_room(memory.estimate()) or (not self._active and self._results.empty()):
+                    break
+                await self._memory_available.wait()
+        return memory.start_request()
+
+    async def _run(self) -> None:
+        gate = _AsyncGate(self._max_in_flight, self._engine.client.limiter.concurrency)
+        tasks: set[asyncio.Task] = set()
+        requests = enumerate(self._requests)
+        if self._memory is not None:
+            self._memory_available = asyncio.Event()
+            self._memory.add_listener(self._memory_released)
+        try:
+            for index, request in requests:
+                if not await self._acquire_credit():
+                    self.unfinished.append((index, request))
+                    self.unfinished.extend(requests)
+                    break
+                # Reserve memory first so no shared slot is held while waiting for it
+                estimate = await self._reserve_memory()
+                await gate.acquire()
+                if self._deadline is not None and self._deadline.winding_down():
+                    gate.release()
+                    if self._memory is not None:
+                        self._memory.cancel_request(estimate)
+                    self.unfinished.append((index, request))
+                    self.unfinished.extend(requests)
+                    break
+                self._active += 1
+                task = asyncio.create_task(self._fetch_one(index, request, estimate))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                # Released on completion, including tasks cancelled before they started
+                task.add_done_callback(lambda done: gate.release())
+                task.add_done_callback(lambda done, estimate=estimate: self._fetch_cancelled(done, estimate))
+            if tasks:
+                await asyncio.gather(*list(tasks))
+            self.unfinished.sort(key=lambda item: item[0])
+        finally:
+            for task in list(tasks):
+                task.cancel()
+            gate.close()
+            if self._memory is not None:
+                self._memory.remove_listener(self._memory_released)
+            self._results.put(_DONE)
+
+    def _fetch_cancelled(self, task: asyncio.Task, estimate: int) -> None:
+        # A task cancelled before or while fetching never reaches its own bookkeeping
+        if task.cancelled():
+            self._active -= 1
+            if self._memory is not None:
+                self._memory.cancel_request(estimate)
+
+    async def _fetch_one(self, index: int, request: FetchRequest, estimate: int = 0) -> None:
+        try:
+            response = await self._engine.fetch(request, self._deadline, self._use_cache, self._recorder)
+            result = FetchResult(index, request, response, None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            result = FetchResult(index, request, None, str(e) or type(e).__name__)
+
+        # Failures caused by the deadline are left for a later invocation rather than reported
+        cut_short = result.error is not None or result.response.status_code in RETRYABLE_STATUS_CODES
+        delivered = not (cut_short and self._deadline is not None and self._deadline.winding_down())
+        if self._memory is not None:
+            self._memory.finish_request(estimate, result.size if delivered else 0)
+        if delivered:
+            self._results.put(result)
+        else:
+            self.unfinished.append((index, request))
+            # The consumer never sees this result, so its credit would otherwise never come back
+            if self._window:
+                self._add_credits(1)
+        self._active -= 1
+
+
+class AsyncFetchEngine:
+    """
+    Async fetcher for one client's service domain and credential, multiplexing
+    requests over HTTP/2 when available.
+    """
+
+    def __init__(self, client: "MicrocmsClient"):
+        self.client = client
+        self._http: Optional[httpx.AsyncClient] = None
+        # Upstream calls in flight by request key; only touched from the loop thread
+        self._in_flight: dict[str, asyncio.Task] = {}
+
+    def stream(
+        self,
+        requests: Iterable[FetchRequest],
+        max_in_flight: int = config.ASYNC_MAX_IN_FLIGHT,
+        deadline: Optional[Deadline] = None,
+        use_cache: Optional[bool] = None,
+        window: Optional[int] = None,
+        recorder: Optional[InvocationMetrics] = None,
+        memory: Optional[MemoryBudget] = None,
+    ) -> FetchStream:
+        return FetchStream(
+            self, requests, max(1, max_in_flight), deadline, use_cache is not False, window, recorder, memory
+        )
+
+    async def fetch(
+        self,
+        request: FetchRequest,
+        deadline: Optional[Deadline],
+        use_cache: bool,
+        recorder: Optional[InvocationMetrics] = None,
+        max_retries: int = config.MAX_RETRIES,
+    ) -> ApiResponse:
+        client = self.client
+        metrics = RequestMetrics(request.endpoint, request.content_id)
+        if recorder is not None:
+            recorder.record(metrics)
+
+        cache_key = None
+        if use_cache:
+            cache_key = response_cache.make_key(client.scope, request.endpoint, request.content_id, request.params)
+            metrics.cache = "bypass" if cache_key is None else "miss"
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                metrics.cache = "hit"
+                metrics.status = cached.status_code
+                metrics.bytes = len(cached.content)
+                cached.metrics = metrics
+                return cached
+
+        # Identical concurrent requests share one upstream call and its decoded body. The call
+        # runs as its own task so a cancelled caller does not cancel it for the others.
+        key = request_key(client.scope, request.endpoint, request.content_id, request.params)
+        task = self._in_flight.get(key)
+        leader = task is None
+        if leader:
+            task = asyncio.ensure_future(
+                self._fetch_response(request, deadline, max_retries, metrics, cache_key)
+            )
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._call_finished(key, done))
+        else:
+            metrics.cache = "coalesced"
+
+        try:
+            response = await asyncio.shield(task)
+        except Exception as e:
+            metrics.error = str(e) or type(e).__name__
+            raise
+
+        if not leader:
+            response = response.share()
+            response.metrics = metrics
+            metrics.status = response.status_code
+            metrics.bytes = len(response.content)
+        return response
+
+    def _call_finished(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the outcome as retrieved even if every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    async def _fetch_response(
+        self,
+        request: FetchRequest,
+        deadline: Optional[Deadline],
+        max_retries: int,
+        metrics: RequestMetrics,
+        cache_key: Optional[str],
+    ) -> ApiResponse:
+        http_response = await self._fetch_with_retries(request, deadline, max_retries, metrics)
+        response = ApiResponse(http_response.status_code, http_response.content, dict(http_response.headers))
+        response.metrics = metrics
+        if cache_key is not None:
+            response_cache.put(cache_key, request.endpoint, response.status_code, response.content, response.headers)
+        return response
+
+    async def _fetch_with_retries(
+        self,
+        request: FetchRequest,
+        deadline: Optional[Deadline],
+        max_retries: int,
+        metrics: RequestMetrics,
+    ) -> httpx.Response:
+        client = self.client
+
+        http = self._get_http()
+        url = client.url(request.endpoint, request.content_id)
+        attempt = 0
+        while True:
+            metrics.retries = attempt
+            wait = client.limiter.bucket.reserve()
+            if wait > 0:
+                if deadline is not None and not deadline.allows(wait):
+                    raise DeadlineExceeded("Time budget exhausted while waiting for the rate limit")
+                await asyncio.sleep(wait)
+
+            try:
+                timeout = config.REQUEST_TIMEOUT if deadline is None else max(0.1, min(config.REQUEST_TIMEOUT, deadline.remaining()))
+                events: dict[str, float] = {}
+
+                async def trace(event_name: str, info: dict) -> None:
+                    events[event_name] = time.perf_counter()
+
+                started = time.perf_counter()
+                http_response = await http.get(url, params=request.params, timeout=timeout, extensions={"trace": trace})
+                finished = time.perf_counter()
+            except httpx.TransportError:
+                delay = backoff_delay(attempt)
+                if attempt >= max_retries or (deadline is not None and not deadline.allows(delay)):
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+
+            self._record_timing(metrics, http_response, events, started, finished)
+            if http_response.status_code not in RETRYABLE_STATUS_CODES:
+                client.limiter.on_success()
+                break
+
+            retry_after = parse_retry_after(http_response.headers.get("Retry-After"))
+            if http_response.status_code == 429:
+                client.limiter.on_throttle(retry_after)
+            delay = retry_after if retry_after is not None else backoff_delay(attempt)
+            if attempt >= max_retries or (deadline is not None and not deadline.allows(delay)):
+                break
+
+            attempt += 1
+            # A Retry-After pause is applied by the bucket on the next reserve
+            if retry_after is None or http_response.status_code != 429:
+                await asyncio.sleep(delay)
+
+        return http_response
+
+    @staticmethod
+    def _record_timing(
+        metrics: RequestMetrics,
+        http_response: httpx.Response,
+        events: dict[str, float],
+        started: float,
+        finished: float,
+    ) -> None:
+        # httpcore trace events; connect covers TCP and TLS setup of a new connection
+        connect = 0.0
+        for phase in ("connection.connect_tcp", "connection.start_tls"):
+            if f"{phase}.started" in events and f"{phase}.complete" in events:
+                connect += events[f"{phase}.complete"] - events[f"{phase}.started"]
+        headers_at = (
+            events.get("http11.receive_response_headers.complete")
+            or events.get("http2.receive_response_headers.complete")
+            or finished
+        )
+        metrics.connect_ms += connect * 1000
+        metrics.ttfb_ms += max(0.0, (headers_at - started - connect) * 1000)
+        metrics.download_ms += (finished - headers_at) * 1000
+        metrics.status = http_response.status_code
+        metrics.bytes = len(http_response.content)
+
+    def close(self) -> None:
+        if self._http is not None:
+            http, self._http = self._http, None
+            _loop_thread.submit(http.aclose())
+
+    def _get_http(self) -> httpx.AsyncClient:
+        # Created lazily on the event loop thread, which owns the connections
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                headers={"X-MICROCMS-API-KEY": self.client.session.headers["X-MICROCMS-API-KEY"]},
+                limits=httpx.Limits(
+                    max_connections=config.ASYNC_MAX_CONNECTIONS,
+                    max_keepalive_connections=config.POOL_MAXSIZE,
+                    keepalive_expiry=config.POOL_IDLE_TIMEOUT,
+                ),
+            )
+        return self._http
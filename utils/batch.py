@@ -0,0 +1,101 @@
+from collections.abc import Generator
+from typing import Any, Optional
+
+from utils.client import ClientView, MicrocmsClient
+from utils.rate_limit import RETRYABLE_STATUS_CODES, Deadline
+
+# The list API accepts at most 100 items per request
+MAX_IDS_PER_REQUEST = 100
+
+
+def chunk_ids(content_ids: list[str], size: int = MAX_IDS_PER_REQUEST) -> list[list[str]]:
+    """
+    Split IDs into `ids=` sized chunks, dropping duplicates but keeping order.
+    """
+    unique_ids = list(dict.fromkeys(cid for cid in content_ids if cid))
+    return [unique_ids[i:i + size] for i in range(0, len(unique_ids), size)]
+
+
+def build_ids_params(chunk: list[str], params: Optional[dict[str, Any]] = None) -> dict[str, Any]:
+    """
+    Build list query parameters that return the full records for `chunk`.
+    """
+    batch_params = dict(params or {})
+    batch_params["ids"] = ",".join(chunk)
+    batch_params["limit"] = len(chunk)
+    batch_params["offset"] = 0
+
+    # `id` is needed to put the records back into the requested order
+    fields = batch_params.get("fields")
+    if fields and "id" not in [f.strip() for f in fields.split(",")]:
+        batch_params["fields"] = f"id,{fields}"
+    return batch_params
+
+
+def order_by_ids(contents: list[dict], chunk: list[str]) -> list[dict]:
+    """
+    Sort records returned by an `ids=` query into the order of `chunk`,
+    keeping only the first record of each ID.
+    """
+    position = {cid: i for i, cid in enumerate(chunk)}
+    unique = {}
+    for item in contents:
+        unique.setdefault(item.get("id"), item)
+    return sorted(unique.values(), key=lambda item: position.get(item.get("id"), len(position)))
+
+
+def iter_by_ids(
+    client: MicrocmsClient | ClientView,
+    endpoint: str,
+    content_ids: list[str],
+    params: Optional[dict[str, Any]] = None,
+    use_cache: Optional[bool] = None,
+    deadline: Optional[Deadline] = None,
+) -> Generator[tuple[list[dict], list[dict], int]]:
+    """
+    Fetch full records with one list request per 100 IDs, yielding
+    (contents, errors, body size in bytes) for each chunk. IDs missing from
+    a response are reported as errors.
+
+    With a `deadline`, iteration stops once it is winding down; the IDs of
+    chunks not yielded by then are neither returned nor reported.
+    """
+    for chunk in chunk_ids(content_ids):
+        if deadline is not None and deadline.winding_down():
+            return
+        try:
+            response = client.get(endpoint, params=build_ids_params(chunk, params), use_cache=use_cache, deadline=deadline)
+        except Exception as e:
+            if deadline is not None and deadline.winding_down():
+                return
+            yield [], [{"content_id": cid, "error": str(e)} for cid in chunk], 0
+            continue
+
+        if response.status_code in RETRYABLE_STATUS_CODES and deadline is not None and deadline.winding_down():
+            return
+        if response.status_code != 200:
+            yield [], [{"content_id": cid, "error": f"HTTP {response.status_code}"} for cid in chunk], 0
+            continue
+
+        contents = order_by_ids(response.json().get("contents", []), chunk)
+        found = {item.get("id") for item in contents}
+        missing = [{"content_id": cid, "error": "Not found"} for cid in chunk if cid not in found]
+        yield contents, missing, len(response.content)
+
+
+def fetch_by_ids(
+    client: MicrocmsClient | ClientView,
+    endpoint: str,
+    content_ids: list[str],
+    params: Optional[dict[str, Any]] = None,
+    use_cache: Optional[bool] = None,
+) -> tuple[list[dict], list[dict]]:
+    """
+    Fetch full records for `content_ids`; returns (contents, errors).
+    """
+    results = []
+    errors = []
+    for contents, chunk_errors, _ in iter_by_ids(client, endpoint, content_ids, params, use_cache=use_cache):
+        results.extend(contents)
+        errors.extend(chunk_errors)
+    return results, errors
@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from urllib.parse import urlencode
+
+from utils import config
+from utils.response import ApiResponse
+
+# Rough per-entry bookkeeping overhead added to the body size
+ENTRY_OVERHEAD_BYTES = 256
+
+
+def request_key(
+    scope: str,
+    endpoint: str,
+    content_id: Optional[str] = None,
+    params: Optional[dict[str, Any]] = None,
+) -> str:
+    """
+    Normalized identity of a GET request; parameter order and None values do
+    not matter. `scope` identifies the service domain and credential.
+    """
+    query = urlencode(sorted((str(k), str(v)) for k, v in (params or {}).items() if v is not None))
+    return f"{scope}/{endpoint}/{content_id or ''}?{query}"
+
+
+class CachedResponse(ApiResponse):
+    """
+    Response served from the cache.
+    """
+
+    from_cache = True
+
+
+class _Entry:
+    __slots__ = ("status_code", "content", "headers", "expires_at", "size")
+
+    def __init__(self, status_code: int, content: bytes, headers: dict[str, str], expires_at: float, size: int):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.expires_at = expires_at
+        self.size = size
+
+
+class ResponseCache:
+    """
+    Thread-safe TTL cache of successful API responses, evicted least recently
+    used first once the total size exceeds `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = config.CACHE_MAX_BYTES,
+        default_ttl: float = config.CACHE_TTL,
+        endpoint_ttls: Optional[dict[str, float]] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.endpoint_ttls = dict(endpoint_ttls if endpoint_ttls is not None else config.CACHE_ENDPOINT_TTLS)
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._bypasses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def make_key(
+        scope: str,
+        endpoint: str,
+        content_id: Optional[str] = None,
+        params: Optional[dict[str, Any]] = None,
+    ) -> Optional[str]:
+        """
+        Build a cache key from the request, or return None when it must not be cached.
+        `scope` identifies the service domain and credential.
+        """
+        # Draft content is private and changes on every edit
+        if (params or {}).get("draftKey"):
+            return None
+        return request_key(scope, endpoint, content_id, params)
+
+    def ttl_for(self, endpoint: str) -> float:
+        return self.endpoint_ttls.get(endpoint, self.default_ttl)
+
+    def get(self, key: Optional[str]) -> Optional[CachedResponse]:
+        with self._lock:
+            if key is None:
+                self._bypasses += 1
+                return None
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove_locked(key)
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+        # A fresh response per hit, so callers can attach their own metrics
+        return CachedResponse(entry.status_code, entry.content, dict(entry.headers))
+
+    def put(self, key: Optional[str], endpoint: str, status_code: int, content: bytes, headers: Optional[dict[str, str]] = None) -> None:
+        if key is None or status_code != 200:
+            return
+        ttl = self.ttl_for(endpoint)
+        size = len(content) + len(key) + ENTRY_OVERHEAD_BYTES
+        if ttl <= 0 or size > self.max_bytes:
+            return
+
+        cached_headers = {"Content-Type": (headers or {}).get("Content-Type", "application/json")}
+        with self._lock:
+            if key in self._entries:
+                self._remove_locked(key)
+            self._entries[key] = _Entry(status_code, content, cached_headers, time.monotonic() + ttl, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                oldest_key = next(iter(self._entries))
+                self._remove_locked(oldest_key)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "bypasses": self._bypasses,
+                "evictions": self._evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _remove_locked(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,291 @@
+import hashlib
+import threading
+import time
+from collections.abc import Iterable
+from typing import Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils import config
+from utils.async_engine import AsyncFetchEngine, FetchRequest, FetchStream
+from utils.cache import request_key, response_cache
+from utils.instrumentation import (
+    InvocationMetrics,
+    RequestMetrics,
+    TimedHTTPConnectionPool,
+    TimedHTTPSConnectionPool,
+    pop_connect_time,
+    reset_connect_time,
+)
+from utils.rate_limit import RETRYABLE_STATUS_CODES, Deadline, backoff_delay, get_limiter, parse_retry_after
+from utils.response import ApiResponse
+from utils.singleflight import SingleFlight
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """
+    Adapter whose connections report their connect (DNS/TCP/TLS) time.
+    """
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+
+class MicrocmsClient:
+    """
+    Keep-alive HTTP client bound to one service domain and API key.
+    """
+
+    def __init__(self, service_domain: str, api_key: str, pool_maxsize: int = config.POOL_MAXSIZE):
+        self.service_domain = service_domain
+        self.credential_id = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+        self.base_url = config.API_BASE_URL.format(service_domain=service_domain).rstrip("/")
+        self.last_used = time.monotonic()
+
+        adapter = TimedHTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_maxsize))
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["X-MICROCMS-API-KEY"] = api_key
+        self.scope = f"{service_domain}:{self.credential_id}"
+        self.limiter = get_limiter(service_domain)
+        self._in_flight = SingleFlight()
+        self._async_engine: Optional[AsyncFetchEngine] = None
+
+    def url(self, endpoint: str, content_id: Optional[str] = None) -> str:
+        if content_id:
+            return f"{self.base_url}/{endpoint}/{content_id}"
+        return f"{self.base_url}/{endpoint}"
+
+    def get(
+        self,
+        endpoint: str,
+        content_id: Optional[str] = None,
+        params: Optional[dict[str, Any]] = None,
+        timeout: float = config.REQUEST_TIMEOUT,
+        use_cache: Optional[bool] = None,
+        deadline: Optional[Deadline] = None,
+        max_retries: int = config.MAX_RETRIES,
+        recorder: Optional[InvocationMetrics] = None,
+    ) -> ApiResponse:
+        use_cache = use_cache is not False
+        metrics = RequestMetrics(endpoint, content_id)
+        if recorder is not None:
+            recorder.record(metrics)
+
+        cache_key = None
+        if use_cache:
+            cache_key = response_cache.make_key(self.scope, endpoint, content_id, params)
+            metrics.cache = "bypass" if cache_key is None else "miss"
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                metrics.cache = "hit"
+                metrics.status = cached.status_code
+                metrics.bytes = len(cached.content)
+                cached.metrics = metrics
+                return cached
+
+        def fetch() -> ApiResponse:
+            response = self._get_with_retries(self.url(endpoint, content_id), params, timeout, deadline, max_retries, metrics)
+            if use_cache:
+                response_cache.put(cache_key, endpoint, response.status_code, response.content, response.headers)
+            return response
+
+        # Identical concurrent requests share one upstream call and its decoded body
+        self.last_used = time.monotonic()
+        try:
+            response, leader = self._in_flight.do(request_key(self.scope, endpoint, content_id, params), fetch)
+        except Exception as e:
+            metrics.error = str(e) or type(e).__name__
+            raise
+        finally:
+            self.last_used = time.monotonic()
+
+        if not leader:
+            response = response.share()
+            response.metrics = metrics
+            metrics.cache = "coalesced"
+            metrics.status = response.status_code
+            metrics.bytes = len(response.content)
+        return response
+
+    @property
+    def async_engine(self) -> AsyncFetchEngine:
+        if self._async_engine is None:
+            self._async_engine = AsyncFetchEngine(self)
+        return self._async_engine
+
+    def stream(self, requests: Iterable[FetchRequest], **options: Any) -> FetchStream:
+        """
+        Fetch many requests concurrently on the async engine; see AsyncFetchEngine.stream.
+        """
+        return self.async_engine.stream(requests, **options)
+
+    def bind(self, **defaults: Any) -> "ClientView":
+        """
+        Return a view of this client whose `get` applies per-invocation defaults
+        such as `use_cache` or `deadline`.
+        """
+        return ClientView(self, defaults)
+
+    def _get_with_retries(
+        self,
+        url: str,
+        params: Optional[dict[str, Any]],
+        timeout: float,
+        deadline: Optional[Deadline],
+        max_retries: int,
+        metrics: RequestMetrics,
+    ) -> ApiResponse:
+        attempt = 0
+        while True:
+            metrics.retries = attempt
+            self.limiter.acquire(deadline)
+            try:
+                request_timeout = timeout if deadline is None else max(0.1, min(timeout, deadline.remaining()))
+                reset_connect_time()
+                started = time.perf_counter()
+                # stream=True returns once the headers arrive, separating TTFB from the body download
+                http_response = self.session.get(url, params=params, timeout=request_timeout, stream=True)
+                headers_at = time.perf_counter()
+                if http_response.status_code not in RETRYABLE_STATUS_CODES or attempt >= max_retries:
+                    content = http_response.content
+                else:
+                    content = b""
+                    http_response.close()
+                finished = time.perf_counter()
+            except (requests.ConnectionError, requests.Timeout):
+                delay = backoff_delay(attempt)
+                if attempt >= max_retries or (deadline is not None and not deadline.allows(delay)):
+                    raise
+                attempt += 1
+                time.sleep(delay)
+                continue
+            finally:
+                self.limiter.release()
+
+            connect_ms = pop_connect_time() * 1000
+            metrics.connect_ms += connect_ms
+            metrics.ttfb_ms += max(0.0, (headers_at - started) * 1000 - connect_ms)
+            metrics.download_ms += (finished - headers_at) * 1000
+            metrics.status = http_response.status_code
+            metrics.bytes += len(content)
+
+            response = ApiResponse(http_response.status_code, content, dict(http_response.headers))
+            response.metrics = metrics
+            if response.status_code not in RETRYABLE_STATUS_CODES:
+                self.limiter.on_success()
+                return response
+
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if response.status_code == 429:
+                # Retry-After pauses the whole domain's bucket, so the next acquire waits for it
+                self.limiter.on_throttle(retry_after)
+            delay = retry_after if retry_after is not None else backoff_delay(attempt)
+            if attempt >= max_retries or (deadline is not None and not deadline.allows(delay)):
+                return response
+
+            attempt += 1
+            if retry_after is None or response.status_code != 429:
+                time.sleep(delay)
+
+    def close(self) -> None:
+        if self._async_engine is not None:
+            self._async_engine.close()
+        self.session.close()
+
+
+class ClientView:
+    """
+    Client wrapper that fills in per-invocation defaults for `get`.
+    """
+
+    def __init__(self, client: MicrocmsClient, defaults: dict[str, Any]):
+        self.client = client
+        self.defaults = defaults
+
+    def get(
+        self,
+        endpoint: str,
+        content_id: Optional[str] = None,
+        params: Optional[dict[str, Any]] = None,
+        **options: Any,
+    ) -> ApiResponse:
+        options = {**self.defaults, **{k: v for k, v in options.items() if v is not None}}
+        return self.client.get(endpoint, content_id, params, **options)
+
+    def stream(self, requests: Iterable[FetchRequest], **options: Any) -> FetchStream:
+        options = {**self.defaults, **{k: v for k, v in options.items() if v is not None}}
+        return self.client.stream(requests, **options)
+
+    def bind(self, **defaults: Any) -> "ClientView":
+        return ClientView(self.client, {**self.defaults, **defaults})
+
+    @property
+    def deadline(self) -> Optional[Deadline]:
+        return self.defaults.get("deadline")
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+
+class ClientRegistry:
+    """
+    Process-wide registry of clients, one per service domain and credential.
+    Clients that have not been used for `idle_timeout` seconds are closed.
+    """
+
+    def __init__(self, pool_maxsize: int = config.POOL_MAXSIZE, idle_timeout: float = config.POOL_IDLE_TIMEOUT):
+        self.pool_maxsize = pool_maxsize
+        self.idle_timeout = idle_timeout
+        self._clients: dict[tuple[str, str], MicrocmsClient] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, pool_maxsize: Optional[int] = None, idle_timeout: Optional[float] = None) -> None:
+        with self._lock:
+            if pool_maxsize is not None:
+                self.pool_maxsize = pool_maxsize
+            if idle_timeout is not None:
+                self.idle_timeout = idle_timeout
+
+    def get(self, service_domain: str, api_key: str) -> MicrocmsClient:
+        key = (service_domain, hashlib.sha256(api_key.encode("utf-8")).hexdigest())
+        with self._lock:
+            self._evict_idle_locked()
+            client = self._clients.get(key)
+            if client is None:
+                client = MicrocmsClient(service_domain, api_key, pool_maxsize=self.pool_maxsize)
+                self._clients[key] = client
+            client.last_used = time.monotonic()
+            return client
+
+    def evict_idle(self) -> None:
+        with self._lock:
+            self._evict_idle_locked()
+
+    def close_all(self) -> None:
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+
+    def _evict_idle_locked(self) -> None:
+        if self.idle_timeout <= 0:
+            return
+        now = time.monotonic()
+        for key, client in list(self._clients.items()):
+            if now - client.last_used > self.idle_timeout:
+                client.close()
+                del self._clients[key]
+
+
+client_registry = ClientRegistry()
+
+
+def get_client(service_domain: str, api_key: str) -> MicrocmsClient:
+    return client_registry.get(service_domain, api_key)
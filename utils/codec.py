@@ -0,0 +1,79 @@
+import json
+import re
+from typing import Any, Optional
+
+# Faster decoders are optional; orjson is preferred over ujson
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+# Name of the library used to decode response bodies
+if orjson is not None:
+    JSON_BACKEND = "orjson"
+elif ujson is not None:
+    JSON_BACKEND = "ujson"
+else:
+    JSON_BACKEND = "json"
+
+# microCMS list responses end with the envelope right after the contents array,
+# e.g. `...}],"totalCount":120,"offset":0,"limit":10}`
+_LIST_ENVELOPE = re.compile(
+    rb'\]\s*,\s*"totalCount"\s*:\s*(\d+)\s*,\s*"offset"\s*:\s*(\d+)\s*,\s*"limit"\s*:\s*(\d+)\s*\}\s*$'
+)
+# Detail responses start with the content ID
+_DETAIL_ID = re.compile(rb'^\s*\{\s*"id"\s*:\s*"((?:[^"\\]|\\.)*)"')
+# Envelope and ID are always within this many bytes of the end or start
+_SCAN_BYTES = 256
+
+
+def loads(data: bytes | str) -> Any:
+    """
+    Decode JSON with the fastest available library. Raises ValueError on
+    malformed input.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    if ujson is not None:
+        return ujson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> str:
+    """
+    Encode JSON compactly with the fastest available library.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    if ujson is not None:
+        return ujson.dumps(obj, ensure_ascii=False)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def list_envelope(content: bytes) -> Optional[dict[str, int]]:
+    """
+    Read `totalCount`, `offset` and `limit` from the tail of a list response
+    without decoding its contents. Returns None when the body does not have
+    the expected layout, in which case callers fall back to a full decode.
+    """
+    match = _LIST_ENVELOPE.search(content[-_SCAN_BYTES:])
+    if match is None:
+        return None
+    total_count, offset, limit = (int(group) for group in match.groups())
+    return {"totalCount": total_count, "offset": offset, "limit": limit}
+
+
+def detail_id(content: bytes) -> Optional[str]:
+    """
+    Read the content ID from the head of a detail response without decoding
+    the rest of the body.
+    """
+    match = _DETAIL_ID.match(content[:_SCAN_BYTES])
+    if match is None:
+        return None
+    return loads(b'"' + match.group(1) + b'"')
@@ -0,0 +1,99 @@
+import os
+import tempfile
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name, "").strip()
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name, "").strip()
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name, "").strip().lower()
+    if not value:
+        return default
+    return value in ("1", "true", "yes", "on")
+
+
+def _env_ttls(name: str) -> dict[str, float]:
+    # Format: "news=30,categories=600"
+    ttls = {}
+    for item in os.environ.get(name, "").split(","):
+        endpoint, _, ttl = item.partition("=")
+        if endpoint.strip() and ttl.strip():
+            try:
+                ttls[endpoint.strip()] = float(ttl)
+            except ValueError:
+                continue
+    return ttls
+
+
+# Base URL of the content API; "{service_domain}" is substituted per credential
+API_BASE_URL = os.environ.get("MICROCMS_API_BASE_URL", "https://{service_domain}.microcms.io/api/v1")
+
+# Dify kills an invocation after this many seconds; main.py passes it to the plugin runtime
+MAX_REQUEST_TIMEOUT = _env_int("MICROCMS_MAX_REQUEST_TIMEOUT", 120)
+
+# Time budget for the upstream work of one invocation, leaving room to emit results
+INVOCATION_BUDGET = _env_float("MICROCMS_INVOCATION_BUDGET", MAX_REQUEST_TIMEOUT - 10.0)
+
+# No new requests are dispatched in the last seconds of the budget, so in-flight ones can finish
+DEADLINE_RESERVE = _env_float("MICROCMS_DEADLINE_RESERVE", 5.0)
+
+# Default timeout (seconds) for a single upstream request
+REQUEST_TIMEOUT = _env_float("MICROCMS_REQUEST_TIMEOUT", 30.0)
+
+# Keep-alive connection pool settings
+POOL_MAXSIZE = _env_int("MICROCMS_POOL_MAXSIZE", 10)
+POOL_IDLE_TIMEOUT = _env_float("MICROCMS_POOL_IDLE_TIMEOUT", 300.0)
+
+# Async fetch engine; with HTTP/2 many requests share one connection
+ASYNC_MAX_CONNECTIONS = _env_int("MICROCMS_ASYNC_MAX_CONNECTIONS", 20)
+# Per-stream cap, and the ceiling the domain's shared concurrency limit ramps up to from MAX_CONCURRENCY
+ASYNC_MAX_IN_FLIGHT = _env_int("MICROCMS_ASYNC_MAX_IN_FLIGHT", 100)
+
+# Response bytes one invocation may hold (in flight, queued and buffered for output); the
+# plugin runs with 256 MB and decoded JSON takes several times its raw size
+MEMORY_BUDGET = _env_int("MICROCMS_MEMORY_BUDGET", 32 * 1024 * 1024)
+# Size assumed for a response before any has been seen
+RESPONSE_SIZE_ESTIMATE = _env_int("MICROCMS_RESPONSE_SIZE_ESTIMATE", 64 * 1024)
+
+# Response cache; the plugin runs with 256 MB, so the cache is capped by size
+CACHE_MAX_BYTES = _env_int("MICROCMS_CACHE_MAX_BYTES", 32 * 1024 * 1024)
+CACHE_TTL = _env_float("MICROCMS_CACHE_TTL", 60.0)
+CACHE_ENDPOINT_TTLS = _env_ttls("MICROCMS_CACHE_ENDPOINT_TTLS")
+
+# Per service domain rate limiting and retries
+RATE_LIMIT = _env_float("MICROCMS_RATE_LIMIT", 50.0)
+RATE_LIMIT_BURST = _env_int("MICROCMS_RATE_LIMIT_BURST", 10)
+# Starting concurrency per domain, shared by every tool; it ramps up to ASYNC_MAX_IN_FLIGHT
+MAX_CONCURRENCY = _env_int("MICROCMS_MAX_CONCURRENCY", 10)
+MAX_RETRIES = _env_int("MICROCMS_MAX_RETRIES", 4)
+RETRY_BACKOFF_BASE = _env_float("MICROCMS_RETRY_BACKOFF_BASE", 0.5)
+RETRY_BACKOFF_MAX = _env_float("MICROCMS_RETRY_BACKOFF_MAX", 10.0)
+
+# Local SQLite mirrors; the query tool re-syncs a mirror older than MIRROR_MAX_AGE seconds
+MIRROR_DIR = os.environ.get("MICROCMS_MIRROR_DIR", "").strip() or os.path.join(tempfile.gettempdir(), "microcms-mirror")
+MIRROR_MAX_AGE = _env_float("MICROCMS_MIRROR_MAX_AGE", 3600.0)
+
+# Cache of rich editor fields converted to markdown or text, capped by characters held
+RICH_TEXT_CACHE_MAX_CHARS = _env_int("MICROCMS_RICH_TEXT_CACHE_MAX_CHARS", 8 * 1024 * 1024)
+
+# Credential validation probes the API once with a short timeout; conclusive results are cached per credential
+CREDENTIAL_PROBE = _env_bool("MICROCMS_CREDENTIAL_PROBE", True)
+CREDENTIAL_PROBE_TIMEOUT = _env_float("MICROCMS_CREDENTIAL_PROBE_TIMEOUT", 5.0)
+CREDENTIAL_PROBE_TTL = _env_float("MICROCMS_CREDENTIAL_PROBE_TTL", 600.0)
@@ -0,0 +1,219 @@
+import logging
+import threading
+import time
+from collections.abc import Callable, Generator
+from typing import Any, Optional
+
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# Per-request entries included in the emitted summary; hooks always get all of them
+MAX_LOGGED_REQUESTS = 100
+
+MetricsHook = Callable[[dict[str, Any], list["RequestMetrics"]], None]
+
+_hooks: list[MetricsHook] = []
+_hooks_lock = threading.Lock()
+
+# Connect time of the current thread's last request, filled in by the timed connections
+_connect_timing = threading.local()
+
+
+def add_metrics_hook(hook: MetricsHook) -> None:
+    """
+    Register a callable receiving (summary, requests) after every tool invocation.
+    """
+    with _hooks_lock:
+        _hooks.append(hook)
+
+
+def remove_metrics_hook(hook: MetricsHook) -> None:
+    with _hooks_lock:
+        if hook in _hooks:
+            _hooks.remove(hook)
+
+
+def reset_connect_time() -> None:
+    _connect_timing.seconds = 0.0
+
+
+def pop_connect_time() -> float:
+    seconds = getattr(_connect_timing, "seconds", 0.0)
+    _connect_timing.seconds = 0.0
+    return seconds
+
+
+class _TimedConnectionMixin:
+    def connect(self) -> None:
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _connect_timing.seconds = getattr(_connect_timing, "seconds", 0.0) + time.perf_counter() - started
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class RequestMetrics:
+    """
+    Timings of one upstream request (or cache lookup).
+
+    `cache` is "off", "miss", "hit", "bypass" (not cacheable) or "coalesced"
+    (shared another caller's in-flight request).
+    """
+
+    __slots__ = (
+        "endpoint", "content_id", "status", "cache", "connect_ms", "ttfb_ms",
+        "download_ms", "parse_ms", "bytes", "retries", "error",
+    )
+
+    def __init__(self, endpoint: str, content_id: Optional[str] = None, cache: str = "off"):
+        self.endpoint = endpoint
+        self.content_id = content_id
+        self.status: Optional[int] = None
+        self.cache = cache
+        self.connect_ms = 0.0
+        self.ttfb_ms = 0.0
+        self.download_ms = 0.0
+        self.parse_ms = 0.0
+        self.bytes = 0
+        self.retries = 0
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> dict[str, Any]:
+        data = {slot: getattr(self, slot) for slot in self.__slots__}
+        for key in ("connect_ms", "ttfb_ms", "download_ms", "parse_ms"):
+            data[key] = round(data[key], 2)
+        return data
+
+
+def _distribution(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {"total": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(values)
+    return {
+        "total": round(sum(ordered), 2),
+        "p50": round(ordered[len(ordered) // 2], 2),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+        "max": round(ordered[-1], 2),
+    }
+
+
+class InvocationMetrics:
+    """
+    Collects request metrics for one tool invocation. Safe to record from
+    worker threads and the async engine.
+    """
+
+    def __init__(self, tool_name: str):
+        self.tool_name = tool_name
+        self.requests: list[RequestMetrics] = []
+        self.emit_ms = 0.0
+        self.details: dict[str, Any] = {}
+        self._started = time.perf_counter()
+        self._finished: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record(self, metrics: RequestMetrics) -> None:
+        with self._lock:
+            self.requests.append(metrics)
+
+    def annotate(self, name: str, value: Any) -> None:
+        """
+        Attach a tool-specific section, such as a projection report, to the summary.
+        """
+        with self._lock:
+            self.details[name] = value
+
+    def track(self, messages: Generator) -> Generator:
+        """
+        Pass messages through, timing how long the consumer (Dify message
+        serialization and transport) holds each one.
+        """
+        for message in messages:
+            started = time.perf_counter()
+            yield message
+            self.emit_ms += (time.perf_counter() - started) * 1000
+
+    def summary(self) -> dict[str, Any]:
+        with self._lock:
+            requests = list(self.requests)
+            details = dict(self.details)
+        finished = self._finished if self._finished is not None else time.perf_counter()
+
+        cache: dict[str, int] = {}
+        for request in requests:
+            cache[request.cache] = cache.get(request.cache, 0) + 1
+        upstream = [r for r in requests if r.cache not in ("hit", "coalesced")]
+
+        return {
+            "tool": self.tool_name,
+            "duration_ms": round((finished - self._started) * 1000, 2),
+            "requests": len(requests),
+            "upstream_requests": len(upstream),
+            "bytes": sum(r.bytes for r in requests),
+            "retries": sum(r.retries for r in requests),
+            "errors": sum(1 for r in requests if r.error or (r.status or 0) >= 400),
+            "cache": cache,
+            "timings_ms": {
+                "connect": _distribution([r.connect_ms for r in upstream]),
+                "ttfb": _distribution([r.ttfb_ms for r in upstream]),
+                "download": _distribution([r.download_ms for r in upstream]),
+                "parse": _distribution([r.parse_ms for r in requests]),
+                "emit": round(self.emit_ms, 2),
+            },
+            **details,
+            "request_log": [r.to_dict() for r in requests[:MAX_LOGGED_REQUESTS]],
+        }
+
+    def finish(self) -> dict[str, Any]:
+        """
+        Freeze the duration, call the registered hooks and return the summary.
+        """
+        self._finished = time.perf_counter()
+        summary = self.summary()
+        with _hooks_lock:
+            hooks = list(_hooks)
+        for hook in hooks:
+            try:
+                hook(summary, list(self.requests))
+            except Exception:
+                logger.exception("microCMS metrics hook failed")
+        return summary
+
+
+def run_instrumented(
+    tool: Any,
+    tool_name: str,
+    tool_parameters: dict[str, Any],
+    run: Callable[[InvocationMetrics], Generator],
+) -> Generator:
+    """
+    Run a tool body with metrics collection, appending a `{"metrics": ...}`
+    JSON message when `include_metrics` is set.
+    """
+    metrics = InvocationMetrics(tool_name)
+    completed = False
+    try:
+        yield from metrics.track(run(metrics))
+        completed = True
+    finally:
+        summary = metrics.finish()
+    if completed and tool_parameters.get("include_metrics", False):
+        yield tool.create_json_message({"metrics": summary})
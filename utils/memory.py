@@ -0,0 +1,153 @@
+import sys
+import threading
+from collections.abc import Callable
+from typing import Any
+
+from utils import config
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def process_peak_rss_mb() -> float:
+    """
+    High-water mark of the process's resident memory, or 0.0 if unknown.
+    """
+    if resource is None:
+        return 0.0
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024, 1)
+
+
+class MemoryBudget:
+    """
+    Byte budget for the response bodies one invocation holds at a time.
+
+    Requests in flight are charged an estimate (the average body size seen
+    so far) until they complete, then their actual size until the consumer
+    releases them. Output buffered for a final message is held the same way.
+    """
+
+    def __init__(self, limit: int = config.MEMORY_BUDGET, initial_estimate: int = config.RESPONSE_SIZE_ESTIMATE):
+        self.limit = max(1, limit)
+        self.initial_estimate = max(1, initial_estimate)
+        self.in_flight = 0
+        self.buffered = 0
+        self.spills = 0
+        self.deferred = 0
+        self._peak = 0
+        self._peak_in_flight = 0
+        self._peak_buffered = 0
+        self._observed_bytes = 0
+        self._observed_count = 0
+        self._listeners: list[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def used(self) -> int:
+        return self.in_flight + self.buffered
+
+    def estimate(self) -> int:
+        with self._lock:
+            if not self._observed_count:
+                return self.initial_estimate
+            return max(1, self._observed_bytes // self._observed_count)
+
+    def has_room(self, nbytes: int) -> bool:
+        with self._lock:
+            return self.in_flight + self.buffered + nbytes <= self.limit
+
+    def exceeded(self) -> bool:
+        with self._lock:
+            return self.in_flight + self.buffered > self.limit
+
+    def start_request(self) -> int:
+        """
+        Charge an in-flight request; returns the estimate to pass to `finish_request`.
+        """
+        estimate = self.estimate()
+        with self._lock:
+            self.in_flight += estimate
+            self._update_peaks_locked()
+        return estimate
+
+    def finish_request(self, estimate: int, actual: int) -> None:
+        """
+        Replace a request's estimate with its actual size, now held until released.
+        """
+        with self._lock:
+            self.in_flight -= estimate
+            self.buffered += actual
+            self._observed_bytes += actual
+            self._observed_count += 1
+            self._update_peaks_locked()
+        self._notify()
+
+    def cancel_request(self, estimate: int) -> None:
+        with self._lock:
+            self.in_flight -= estimate
+        self._notify()
+
+    def defer(self) -> None:
+        """
+        Count a dispatch that had to wait for room in the budget.
+        """
+        with self._lock:
+            self.deferred += 1
+
+    def spill(self) -> None:
+        """
+        Count buffered output sent early to stay within the budget.
+        """
+        with self._lock:
+            self.spills += 1
+
+    def hold(self, nbytes: int) -> None:
+        with self._lock:
+            self.buffered += nbytes
+            self._update_peaks_locked()
+
+    def release(self, nbytes: int) -> None:
+        if nbytes <= 0:
+            return
+        with self._lock:
+            self.buffered = max(0, self.buffered - nbytes)
+        self._notify()
+
+    def add_listener(self, listener: Callable[[], None]) -> None:
+        """
+        Call `listener` whenever bytes are released; it runs on the releasing thread.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[], None]) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "budget_bytes": self.limit,
+                "peak_bytes": self._peak,
+                "peak_in_flight_bytes": self._peak_in_flight,
+                "peak_buffered_bytes": self._peak_buffered,
+                "deferred_dispatches": self.deferred,
+                "spilled_messages": self.spills,
+                "process_peak_rss_mb": process_peak_rss_mb(),
+            }
+
+    def _update_peaks_locked(self) -> None:
+        self._peak = max(self._peak, self.in_flight + self.buffered)
+        self._peak_in_flight = max(self._peak_in_flight, self.in_flight)
+        self._peak_buffered = max(self._peak_buffered, self.buffered)
+
+    def _notify(self) -> None:
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener()
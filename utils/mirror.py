@@ -0,0 +1,533 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections.abc import Generator, Iterable
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, NamedTuple, Optional
+
+import requests
+
+from utils import codec, config
+from utils.batch import iter_by_ids
+from utils.client import ClientView, MicrocmsClient
+from utils.pagination import PAGE_SIZE, iter_pages
+from utils.sync import content_version, diff_snapshot, list_versions
+
+# Built-in fields stored in their own columns so they are indexed without JSON access
+_COLUMNS = {"id": "id", "publishedAt": "published_at"}
+
+# Keyword search matches text values only; IDs and system timestamps are not content
+_SEARCH = (
+    "EXISTS (SELECT 1 FROM json_tree(contents.data) AS node WHERE node.type = 'text' "
+    "AND node.key NOT IN ('id', 'createdAt', 'updatedAt', 'publishedAt', 'revisedAt') "
+    "AND instr(lower(node.value), lower(?)) > 0)"
+)
+
+# Field IDs usable in filters, orders and indexes; they are inlined into SQL, so nothing else is accepted
+_FIELD = re.compile(r"^[A-Za-z0-9_-]+(\.[A-Za-z0-9_-]+)*$")
+
+# One filter condition: field[operator]value
+_CONDITION = re.compile(r"^([A-Za-z0-9_.-]+)\[([a-z_]+)\](.*)$", re.S)
+
+_CONNECTOR = re.compile(r"(\[and\]|\[or\])")
+
+_NUMBER = re.compile(r"^-?\d+(\.\d+)?$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS contents (
+    endpoint TEXT NOT NULL,
+    id TEXT NOT NULL,
+    published_at TEXT,
+    version TEXT NOT NULL,
+    generation INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (endpoint, id)
+);
+CREATE INDEX IF NOT EXISTS contents_published_at ON contents (endpoint, published_at);
+CREATE TABLE IF NOT EXISTS mirrors (
+    endpoint TEXT PRIMARY KEY,
+    synced_at REAL NOT NULL,
+    total_count INTEGER NOT NULL,
+    generation INTEGER NOT NULL,
+    params TEXT NOT NULL,
+    index_fields TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_progress (
+    endpoint TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL,
+    params TEXT NOT NULL,
+    next_offset INTEGER NOT NULL
+);
+"""
+
+
+def field_expr(field: str) -> str:
+    """
+    SQL expression reading `field` of a mirrored record. Reference fields
+    evaluate to the referenced content's ID, as in content API filters.
+    """
+    if field in _COLUMNS:
+        return _COLUMNS[field]
+    if not _FIELD.match(field):
+        raise ValueError(f"Invalid field name: {field}")
+    path = "$" + "".join(f'."{segment}"' for segment in field.split("."))
+    return f"coalesce(json_extract(data, '{path}.\"id\"'), json_extract(data, '{path}'))"
+
+
+def _scalar(value: str) -> Any:
+    if _NUMBER.match(value):
+        return float(value) if "." in value else int(value)
+    return value
+
+
+def _candidates(value: str) -> list[Any]:
+    # JSON numbers and booleans come back from json_extract as SQL numbers
+    candidates: list[Any] = [value]
+    if _NUMBER.match(value):
+        candidates.append(_scalar(value))
+    elif value in ("true", "false"):
+        candidates.append(1 if value == "true" else 0)
+    return candidates
+
+
+def _compile_condition(condition: str) -> tuple[str, list[Any]]:
+    match = _CONDITION.match(condition.strip())
+    if match is None:
+        raise ValueError(f"Invalid filter condition: {condition}")
+    field, operator, value = match.groups()
+    expr = field_expr(field)
+
+    if operator in ("equals", "not_equals", "in"):
+        values = value.split(",") if operator == "in" else [value]
+        candidates = [candidate for v in values for candidate in _candidates(v.strip())]
+        placeholders = ", ".join("?" * len(candidates))
+        if operator == "not_equals":
+            return f"({expr} IS NULL OR {expr} NOT IN ({placeholders}))", candidates
+        return f"{expr} IN ({placeholders})", candidates
+    if operator == "less_than":
+        return f"{expr} < ?", [_scalar(value)]
+    if operator == "greater_than":
+        return f"{expr} > ?", [_scalar(value)]
+    if operator == "contains":
+        return f"instr({expr}, ?) > 0", [value]
+    if operator == "not_contains":
+        return f"({expr} IS NULL OR instr({expr}, ?) = 0)", [value]
+    if operator == "begins_with":
+        return f"substr({expr}, 1, ?) = ?", [len(value), value]
+    if operator == "exists":
+        return f"{expr} IS NOT NULL", []
+    if operator == "not_exists":
+        return f"{expr} IS NULL", []
+    raise ValueError(f"Unsupported filter operator: {operator}")
+
+
+def _tokenize_filters(filters: str) -> list[str]:
+    tokens = []
+    depth = 0
+    for part in _CONNECTOR.split(filters):
+        if part in ("[and]", "[or]"):
+            tokens.append(part)
+            continue
+        part = part.strip()
+        while part.startswith("("):
+            tokens.append("(")
+            depth += 1
+            part = part[1:].lstrip()
+        # Only strip as many closing parentheses as are open, so values may end with ")"
+        closing = 0
+        while depth and part.endswith(")"):
+            closing += 1
+            depth -= 1
+            part = part[:-1].rstrip()
+        tokens.append(part)
+        tokens.extend(")" * closing)
+    return tokens
+
+
+def compile_filters(filters: str) -> tuple[str, list[Any]]:
+    """
+    Translate content API `filters` (conditions joined by `[and]`/`[or]`,
+    optionally grouped with parentheses) into an SQL expression and parameters.
+    """
+    tokens = _tokenize_filters(filters)
+    position = 0
+
+    def peek() -> Optional[str]:
+        return tokens[position] if position < len(tokens) else None
+
+    def parse_or() -> tuple[str, list[Any]]:
+        nonlocal position
+        sql, params = parse_and()
+        while peek() == "[or]":
+            position += 1
+            right_sql, right_params = parse_and()
+            sql, params = f"({sql} OR {right_sql})", params + right_params
+        return sql, params
+
+    def parse_and() -> tuple[str, list[Any]]:
+        nonlocal position
+        sql, params = parse_factor()
+        while peek() == "[and]":
+            position += 1
+            right_sql, right_params = parse_factor()
+            sql, params = f"({sql} AND {right_sql})", params + right_params
+        return sql, params
+
+    def parse_factor() -> tuple[str, list[Any]]:
+        nonlocal position
+        token = peek()
+        if token is None or token in ("[and]", "[or]", ")"):
+            raise ValueError(f"Invalid filters: {filters}")
+        position += 1
+        if token == "(":
+            sql, params = parse_or()
+            if peek() != ")":
+                raise ValueError(f"Unbalanced parentheses in filters: {filters}")
+            position += 1
+            return sql, params
+        return _compile_condition(token)
+
+    sql, params = parse_or()
+    if position != len(tokens):
+        raise ValueError(f"Invalid filters: {filters}")
+    return sql, params
+
+
+def compile_orders(orders: str) -> str:
+    """
+    Translate content API `orders` (`-publishedAt,title`) into an ORDER BY
+    clause. The default is newest `publishedAt` first.
+    """
+    terms = []
+    for part in orders.split(","):
+        part = part.strip()
+        if part:
+            field = part.lstrip("-")
+            terms.append(f"{field_expr(field)} {'DESC' if part.startswith('-') else 'ASC'}")
+    if not terms:
+        terms.append("published_at DESC")
+    terms.append("id ASC")
+    return ", ".join(terms)
+
+
+class MirrorInfo(NamedTuple):
+    """
+    Sync state of one mirrored endpoint.
+    """
+
+    endpoint: str
+    synced_at: float
+    total_count: int
+    generation: int
+    params: dict[str, Any]
+    index_fields: list[str]
+
+    def freshness(self) -> dict[str, Any]:
+        return {
+            "endpoint": self.endpoint,
+            "syncedAt": datetime.fromtimestamp(self.synced_at, timezone.utc).isoformat(),
+            "ageSeconds": round(time.time() - self.synced_at, 1),
+            "totalCount": self.total_count,
+        }
+
+
+class SyncProgress(NamedTuple):
+    """
+    Where an interrupted full sync continues: the generation it writes and
+    the next list offset to fetch.
+    """
+
+    generation: int
+    params: dict[str, Any]
+    next_offset: int
+
+
+class SyncResult(NamedTuple):
+    """
+    `complete` is False when the time budget ran out first; the work done is
+    kept and the next sync continues from there.
+    """
+
+    mode: str
+    fetched: int
+    deleted: int
+    failed: list[dict]
+    complete: bool = True
+
+
+class MirrorStore:
+    """
+    SQLite file holding the mirrored endpoints of one service domain and
+    credential. A single connection is shared and serialized with a lock.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.RLock()
+        self._sync_locks: dict[str, threading.Lock] = {}
+
+    @contextmanager
+    def _transaction(self) -> Generator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def sync_lock(self, endpoint: str) -> threading.Lock:
+        """
+        Lock held while an endpoint syncs, so concurrent invocations do not sync it twice.
+        """
+        with self._lock:
+            return self._sync_locks.setdefault(endpoint, threading.Lock())
+
+    def info(self, endpoint: str) -> Optional[MirrorInfo]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT synced_at, total_count, generation, params, index_fields FROM mirrors WHERE endpoint = ?",
+                (endpoint,),
+            ).fetchone()
+        if row is None:
+            return None
+        synced_at, total_count, generation, params, index_fields = row
+        return MirrorInfo(endpoint, synced_at, total_count, generation, codec.loads(params), codec.loads(index_fields))
+
+    def progress(self, endpoint: str) -> Optional[SyncProgress]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT generation, params, next_offset FROM sync_progress WHERE endpoint = ?", (endpoint,)
+            ).fetchone()
+        if row is None:
+            return None
+        generation, params, next_offset = row
+        return SyncProgress(generation, codec.loads(params), next_offset)
+
+    def ensure_indexes(self, fields: Iterable[str]) -> None:
+        """
+        Create an expression index for each field, shared by every endpoint.
+        """
+        with self._lock:
+            for field in fields:
+                if field in _COLUMNS:
+                    continue
+                expr = field_expr(field)
+                name = f"contents_{re.sub(r'[^A-Za-z0-9]', '_', field)}_{hashlib.sha1(field.encode()).hexdigest()[:8]}"
+                self._conn.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON contents (endpoint, {expr})')
+
+    def versions(self, endpoint: str) -> dict[str, str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT id, version FROM contents WHERE endpoint = ?", (endpoint,)).fetchall()
+        return dict(rows)
+
+    def upsert(
+        self, endpoint: str, items: list[dict], generation: int, progress: Optional[SyncProgress] = None
+    ) -> None:
+        """
+        Write `items`, and with `progress` record in the same transaction where a full sync continues.
+        """
+        rows = [
+            (endpoint, item["id"], item.get("publishedAt"), content_version(item), generation, codec.dumps(item))
+            for item in items
+            if item.get("id")
+        ]
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO contents (endpoint, id, published_at, version, generation, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            if progress is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO sync_progress (endpoint, generation, params, next_offset) VALUES (?, ?, ?, ?)",
+                    (endpoint, progress.generation, codec.dumps(progress.params), progress.next_offset),
+                )
+
+    def delete(self, endpoint: str, content_ids: list[str]) -> int:
+        with self._transaction() as conn:
+            return sum(
+                conn.execute("DELETE FROM contents WHERE endpoint = ? AND id = ?", (endpoint, cid)).rowcount
+                for cid in content_ids
+            )
+
+    def delete_stale(self, endpoint: str, generation: int) -> int:
+        """
+        Remove records not written by the sync of `generation`.
+        """
+        with self._transaction() as conn:
+            return conn.execute(
+                "DELETE FROM contents WHERE endpoint = ? AND generation != ?", (endpoint, generation)
+            ).rowcount
+
+    def finish_sync(self, endpoint: str, generation: int, params: dict[str, Any], index_fields: list[str]) -> MirrorInfo:
+        with self._transaction() as conn:
+            (total_count,) = conn.execute("SELECT COUNT(*) FROM contents WHERE endpoint = ?", (endpoint,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO mirrors (endpoint, synced_at, total_count, generation, params, index_fields) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (endpoint, time.time(), total_count, generation, codec.dumps(params), codec.dumps(index_fields)),
+            )
+            conn.execute("DELETE FROM sync_progress WHERE endpoint = ?", (endpoint,))
+        return self.info(endpoint)
+
+    def query(
+        self,
+        endpoint: str,
+        filters: str = "",
+        orders: str = "",
+        q: str = "",
+        limit: int = 10,
+        offset: int = 0,
+    ) -> tuple[list[dict], int]:
+        """
+        Answer a list query from the mirror, returning (contents, totalCount).
+        """
+        where = ["endpoint = ?"]
+        params: list[Any] = [endpoint]
+        if filters:
+            sql, filter_params = compile_filters(filters)
+            where.append(sql)
+            params.extend(filter_params)
+        if q:
+            where.append(_SEARCH)
+            params.append(q)
+        where_sql = " AND ".join(where)
+        order_sql = compile_orders(orders)
+
+        with self._lock:
+            (total_count,) = self._conn.execute(f"SELECT COUNT(*) FROM contents WHERE {where_sql}", params).fetchone()
+            rows = self._conn.execute(
+                f"SELECT data FROM contents WHERE {where_sql} ORDER BY {order_sql} LIMIT ? OFFSET ?",
+                [*params, limit, offset],
+            ).fetchall()
+        return [codec.loads(data) for (data,) in rows], total_count
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_stores: dict[str, MirrorStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(client: MicrocmsClient | ClientView) -> MirrorStore:
+    """
+    Process-wide store for the client's service domain and credential.
+    """
+    domain = re.sub(r"[^A-Za-z0-9_-]", "_", client.service_domain)
+    path = os.path.join(config.MIRROR_DIR, f"{domain}-{client.credential_id}.sqlite3")
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = MirrorStore(path)
+        return store
+
+
+def sync_mirror(
+    store: MirrorStore,
+    client: MicrocmsClient | ClientView,
+    endpoint: str,
+    params: Optional[dict[str, Any]] = None,
+    index_fields: Optional[list[str]] = None,
+    max_concurrent: int = 5,
+    full: bool = False,
+) -> tuple[SyncResult, MirrorInfo]:
+    """
+    Bring the mirror of `endpoint` up to date.
+
+    The first sync, a change of `params` (depth, richEditorFormat) or `full`
+    reloads every page. Later syncs compare versions with a cheap list pass
+    and fetch only created and updated records, 100 IDs per request.
+    `params` and `index_fields` default to those of the previous sync.
+
+    When the deadline of a bound client winds down first, the records written
+    so far are kept and an incomplete result is returned with the previous
+    info (None before the first complete sync); a full reload records its
+    offset after each page and the next call continues from there.
+    """
+    deadline = client.deadline if isinstance(client, ClientView) else None
+    with store.sync_lock(endpoint):
+        previous = store.info(endpoint)
+        if params is None:
+            params = previous.params if previous else {}
+        index_fields = list(dict.fromkeys([*(previous.index_fields if previous else []), *(index_fields or [])]))
+        store.ensure_indexes(index_fields)
+
+        # An interrupted full reload continues unless the params changed since
+        interrupted = store.progress(endpoint)
+        progress = interrupted if interrupted is not None and interrupted.params == params else None
+
+        if full or progress is not None or previous is None or previous.params != params:
+            if progress is not None:
+                generation, next_offset = progress.generation, progress.next_offset
+            else:
+                generation = max(previous.generation if previous else 0, interrupted.generation if interrupted else 0) + 1
+                next_offset = 0
+            fetched = 0
+            complete = True
+            try:
+                for page in iter_pages(
+                    client, endpoint, {**params, "offset": next_offset}, max_concurrent=max_concurrent, use_cache=False
+                ):
+                    contents = page.get("contents", [])
+                    next_offset += PAGE_SIZE
+                    store.upsert(endpoint, contents, generation, SyncProgress(generation, params, next_offset))
+                    fetched += len(contents)
+                    if deadline is not None and deadline.winding_down():
+                        complete = False
+                        break
+            except requests.RequestException:
+                if deadline is None or not deadline.winding_down():
+                    raise
+                complete = False
+            if not complete:
+                return SyncResult("full", fetched, 0, [], complete=False), previous
+            deleted = store.delete_stale(endpoint, generation)
+            result = SyncResult("full", fetched, deleted, [])
+        else:
+            generation = previous.generation
+            fetched = 0
+            failed = []
+            removed = []
+            changed = []
+            covered = 0
+            complete = True
+            try:
+                current = list_versions(client, endpoint, max_concurrent=max_concurrent)
+                created, updated, removed = diff_snapshot(store.versions(endpoint), current)
+                changed = created + updated
+                for contents, errors, _ in iter_by_ids(
+                    client, endpoint, changed, params, use_cache=False, deadline=deadline
+                ):
+                    store.upsert(endpoint, contents, generation)
+                    fetched += len(contents)
+                    covered += len(contents) + len(errors)
+                    for error in errors:
+                        # Deleted between the version pass and the fetch
+                        if error["error"] == "Not found":
+                            removed.append(error["content_id"])
+                        else:
+                            failed.append(error)
+            except requests.RequestException:
+                if deadline is None or not deadline.winding_down():
+                    raise
+                complete = False
+            deleted = store.delete(endpoint, removed)
+            if not complete or covered < len(changed):
+                # Upserted records carry their new versions, so the next diff fetches only the rest
+                return SyncResult("incremental", fetched, deleted, failed, complete=False), previous
+            result = SyncResult("incremental", fetched, deleted, failed)
+
+        return result, store.finish_sync(endpoint, generation, params, index_fields)
@@ -0,0 +1,35 @@
+from collections.abc import Iterator
+
+from utils.async_engine import FetchResult, FetchStream
+from utils.rate_limit import DeadlineExceeded
+
+
+def iter_in_order(stream: FetchStream) -> Iterator[FetchResult]:
+    """
+    Re-emit a completion-ordered stream in request order.
+
+    Open the stream with a `window` so that at most that many results are
+    dispatched ahead of the next one to emit; this caps the reorder buffer at
+    the window size instead of the whole result set.
+
+    If the stream gives up waiting (DeadlineExceeded), the buffered results
+    are still emitted in order before the exception is re-raised.
+    """
+    buffer: dict[int, FetchResult] = {}
+    next_index = 0
+    try:
+        for result in stream:
+            buffer[result.index] = result
+            while next_index in buffer:
+                item = buffer.pop(next_index)
+                next_index += 1
+                stream.release()
+                yield item
+    except DeadlineExceeded:
+        for index in sorted(buffer):
+            yield buffer[index]
+        raise
+
+    # Requests that never ran (e.g. after the deadline) leave gaps; emit the rest in order
+    for index in sorted(buffer):
+        yield buffer[index]
@@ -0,0 +1,186 @@
+from collections.abc import Generator
+from typing import Any, Optional
+
+from dify_plugin import Tool
+from dify_plugin.entities.tool import ToolInvokeMessage
+
+from utils.memory import MemoryBudget
+from utils.references import ReferenceExpander
+from utils.resume import ResumeCursor, encode_cursor
+from utils.richtext import RichTextConverter
+
+OUTPUT_MODES = ("combined", "stream", "chunked")
+
+
+def item_share(body: bytes, items: list[dict]) -> int:
+    """
+    Each item's share of a list response body, for charging a memory budget.
+    """
+    return len(body) // max(1, len(items))
+
+
+class ContentWriter:
+    """
+    Turns fetched content into tool messages.
+
+    `combined` buffers everything into one final message, `stream` yields each
+    item as its own message and `chunked` yields lists of `chunk_size` items,
+    followed by an optional summary message.
+
+    With an `expander`, `inline` references are resolved before each message
+    is emitted, and `normalized` references are fetched once at the end and
+    returned as `entities` (in the combined message, or as a separate message
+    when streaming).
+
+    With a `converter`, rich editor fields are converted as each item is added.
+
+    Work left undone when the time budget runs out is collected in `pending`
+    and returned as an opaque `resume_cursor` with the summary.
+
+    With a `memory` budget, buffered items are held against it; once the
+    budget is exceeded, the buffer is sent early as a partial `contents`
+    message (a short chunk, or part of the combined output) instead of
+    growing until the end.
+    """
+
+    def __init__(
+        self,
+        tool: Tool,
+        output_mode: str = "combined",
+        chunk_size: int = 10,
+        include_summary: bool = True,
+        expander: Optional[ReferenceExpander] = None,
+        converter: Optional[RichTextConverter] = None,
+        memory: Optional[MemoryBudget] = None,
+    ):
+        self.tool = tool
+        self.output_mode = output_mode if output_mode in OUTPUT_MODES else "combined"
+        self.chunk_size = max(1, chunk_size)
+        self.include_summary = include_summary
+        self.contents: list[dict] = []
+        self.errors: list[dict] = []
+        self.count = 0
+        self.first_id = None
+        self.expander = expander
+        self.converter = converter
+        self.pending: Optional[ResumeCursor] = None
+        self.memory = memory
+        self.held = 0
+        self.spilled = 0
+
+    @property
+    def streaming(self) -> bool:
+        return self.output_mode != "combined"
+
+    @property
+    def interrupted(self) -> bool:
+        return self.pending is not None and bool(self.pending.ids or self.pending.offsets)
+
+    def add(self, item: dict, size: Optional[int] = None) -> Generator[ToolInvokeMessage]:
+        """
+        `size` is the item's share of the response body in bytes, charged to
+        the memory budget while the item is buffered; items without one are not charged.
+        """
+        self.count += 1
+        if self.converter is not None:
+            item = self.converter.apply(item)
+        if self.first_id is None:
+            self.first_id = item.get("id")
+        if self.expander is not None and self.expander.normalized:
+            self.expander.collect([item])
+        if self.output_mode == "stream":
+            yield self.tool.create_json_message(self._expand([item])[0])
+            return
+        self.contents.append(item)
+        if self.memory is not None and size:
+            self.held += size
+            self.memory.hold(size)
+        if self.output_mode == "chunked" and len(self.contents) >= self.chunk_size:
+            yield from self.flush()
+        elif self.memory is not None and self.memory.exceeded():
+            yield from self._spill()
+
+    def add_error(self, content_id: Any, error: str) -> None:
+        self.errors.append({
+            "content_id": content_id,
+            "error": error
+        })
+
+    def flush(self) -> Generator[ToolInvokeMessage]:
+        if self.streaming and self.contents:
+            yield self.tool.create_json_message({"contents": self._expand(self.contents)})
+            self.contents = []
+            self._release()
+
+    def finish(self, summary: dict[str, Any]) -> Generator[ToolInvokeMessage]:
+        normalized = self.expander is not None and self.expander.normalized
+        if not self.streaming:
+            response = {**summary, "contents": self._expand(self.contents)}
+            if normalized:
+                # Records referenced by spilled messages are only sent here
+                response.update(self.expander.payload(None if self.spilled else self.contents))
+            self._take_reference_errors()
+            if self.errors:
+                response["errors"] = self.errors
+            if self.spilled:
+                response["spilled_messages"] = self.spilled
+            response.update(self._resume_fields())
+            self.contents = []
+            self._release()
+            yield self.tool.create_json_message(response)
+            return
+
+        yield from self.flush()
+        if normalized:
+            yield self.tool.create_json_message(self.expander.payload())
+        self._take_reference_errors()
+        if self.include_summary:
+            response = {**summary, "retrieved": self.count}
+            if self.errors:
+                response["errors"] = self.errors
+            response.update(self._resume_fields())
+            yield self.tool.create_json_message(response)
+        else:
+            # The cursor is the only way to continue, so it is sent even without a summary
+            yield from self.finish_resume()
+
+    def finish_resume(self) -> Generator[ToolInvokeMessage]:
+        """
+        Emit the resume cursor on its own, for output modes without a final summary.
+        """
+        if self.interrupted:
+            yield self.tool.create_json_message(self._resume_fields())
+
+    def _resume_fields(self) -> dict[str, Any]:
+        if not self.interrupted:
+            return {}
+        return {
+            "resume_cursor": encode_cursor(self.pending),
+            "remaining": {"ids": len(self.pending.ids), "pages": len(self.pending.offsets)},
+        }
+
+    def _spill(self) -> Generator[ToolInvokeMessage]:
+        if not self.streaming and not self.memory.spills:
+            yield self.tool.create_text_message(
+                "Memory budget reached: sending contents in several messages; the last one carries the summary"
+            )
+        yield self.tool.create_json_message({"contents": self._expand(self.contents)})
+        self.contents = []
+        self.spilled += 1
+        self.memory.spill()
+        self._release()
+
+    def _release(self) -> None:
+        if self.memory is not None:
+            self.memory.release(self.held)
+        self.held = 0
+
+    def _expand(self, items: list[dict]) -> list[dict]:
+        if self.expander is None or self.expander.normalized:
+            return items
+        return self.expander.inline(items)
+
+    def _take_reference_errors(self) -> None:
+        if self.expander is not None and self.expander.errors:
+            self.errors.extend(self.expander.errors)
+            self.expander.errors = []
@@ -0,0 +1,93 @@
+import concurrent.futures
+from collections import deque
+from collections.abc import Generator
+from typing import Any, Optional
+
+from utils.client import ClientView, MicrocmsClient
+from utils.response import ApiResponse
+
+# Largest page the list API returns
+PAGE_SIZE = 100
+
+
+class PageFetchError(Exception):
+    """
+    Raised when a page request returns a non-success status.
+    """
+
+    def __init__(self, response: ApiResponse, offset: int):
+        super().__init__(f"HTTP {response.status_code} at offset {offset}")
+        self.response = response
+        self.offset = offset
+
+
+def plan_offsets(total_count: int, start: int, page_size: int = PAGE_SIZE) -> list[int]:
+    """
+    Offsets of the pages that follow the first one.
+    """
+    return list(range(start + page_size, total_count, page_size))
+
+
+def iter_page_responses(
+    client: MicrocmsClient | ClientView,
+    endpoint: str,
+    params: Optional[dict[str, Any]] = None,
+    max_concurrent: int = 5,
+    page_size: int = PAGE_SIZE,
+    use_cache: Optional[bool] = None,
+    offsets: Optional[list[int]] = None,
+) -> Generator[ApiResponse]:
+    """
+    Yield the response of every page of a list query in offset order,
+    without decoding the bodies.
+
+    The first response's `totalCount` plans the remaining offsets, which are
+    fetched concurrently with at most `max_concurrent` pages in flight, so only
+    a bounded number of pages is held in memory at once. Given `offsets`,
+    exactly those pages are fetched instead.
+    """
+    page_params = dict(params or {})
+    start = int(page_params.get("offset", 0) or 0)
+    page_params["limit"] = page_size
+
+    def fetch_page(offset: int) -> ApiResponse:
+        response = client.get(endpoint, params={**page_params, "offset": offset}, use_cache=use_cache)
+        if response.status_code != 200:
+            raise PageFetchError(response, offset)
+        return response
+
+    if offsets is None:
+        first_page = fetch_page(start)
+        yield first_page
+        offsets = plan_offsets(first_page.list_envelope()["totalCount"], start, page_size)
+
+    offsets = deque(sorted(offsets))
+    if not offsets:
+        return
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, max_concurrent)) as executor:
+        pending = deque()
+        try:
+            while offsets or pending:
+                while offsets and len(pending) < max_concurrent:
+                    pending.append(executor.submit(fetch_page, offsets.popleft()))
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def iter_pages(
+    client: MicrocmsClient | ClientView,
+    endpoint: str,
+    params: Optional[dict[str, Any]] = None,
+    max_concurrent: int = 5,
+    page_size: int = PAGE_SIZE,
+    use_cache: Optional[bool] = None,
+    offsets: Optional[list[int]] = None,
+) -> Generator[dict]:
+    """
+    Yield every decoded page of a list query in offset order; see iter_page_responses.
+    """
+    for response in iter_page_responses(client, endpoint, params, max_concurrent, page_size, use_cache, offsets):
+        yield response.json()
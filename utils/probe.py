@@ -0,0 +1,74 @@
+import threading
+import time
+from typing import NamedTuple, Optional
+
+import requests
+
+from utils import config
+from utils.client import MicrocmsClient
+
+# The cheapest list request: no items and only the ID field
+PROBE_PARAMS = {"limit": 0, "fields": "id"}
+
+
+class ProbeResult(NamedTuple):
+    """
+    `valid` is None when the probe was inconclusive (network trouble, rate
+    limiting, server errors); such results never fail validation.
+    """
+
+    valid: Optional[bool]
+    message: str
+
+
+class CredentialProbe:
+    """
+    Checks a service domain and API key with one minimal request, caching
+    conclusive results per credential for `ttl` seconds.
+    """
+
+    def __init__(self, timeout: float = config.CREDENTIAL_PROBE_TIMEOUT, ttl: float = config.CREDENTIAL_PROBE_TTL):
+        self.timeout = timeout
+        self.ttl = ttl
+        self._results: dict[str, tuple[ProbeResult, float]] = {}
+        self._lock = threading.Lock()
+
+    def check(self, client: MicrocmsClient, endpoint: str = "") -> ProbeResult:
+        """
+        Probe `endpoint` (or the API root when none is given). The probe's
+        pooled connection is reused by the first tool call, so it doubles as warm-up.
+
+        Without an endpoint only a rejected API key is conclusive, since the
+        API root answers 404 for every service.
+        """
+        key = f"{client.scope}/{endpoint}"
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None and cached[1] > time.monotonic():
+                return cached[0]
+
+        try:
+            response = client.get(endpoint, params=PROBE_PARAMS, timeout=self.timeout, use_cache=False, max_retries=0)
+        except requests.RequestException as e:
+            return ProbeResult(None, f"Could not reach microCMS: {str(e)}")
+
+        result = self._interpret(response.status_code, endpoint)
+        if result.valid is not None:
+            with self._lock:
+                self._results[key] = (result, time.monotonic() + self.ttl)
+        return result
+
+    def _interpret(self, status_code: int, endpoint: str) -> ProbeResult:
+        if status_code == 401:
+            return ProbeResult(False, "Invalid API key")
+        if status_code == 403 and endpoint:
+            return ProbeResult(False, f"API key is not allowed to read endpoint '{endpoint}'")
+        if status_code == 404 and endpoint:
+            return ProbeResult(False, "Endpoint not found or service domain is invalid")
+        # A 400 means the API authenticated the request and only disliked the query
+        if status_code in (200, 400):
+            return ProbeResult(True, "Credentials are valid")
+        return ProbeResult(None, f"Credential check was inconclusive (HTTP {status_code})")
+
+
+credential_probe = CredentialProbe()
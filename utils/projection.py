@@ -0,0 +1,158 @@
+import re
+from collections.abc import Generator
+from typing import Any, NamedTuple, Optional
+
+from dify_plugin import Tool
+from dify_plugin.entities.tool import ToolInvokeMessage
+
+from utils.client import ClientView, MicrocmsClient
+from utils.instrumentation import InvocationMetrics
+
+# microCMS expands references at most three levels deep
+MAX_DEPTH = 3
+
+# Array markers such as `tags[]` or `tags[0]`; the fields parameter addresses every element
+_INDEX = re.compile(r"\[\d*\]")
+
+
+class Projection(NamedTuple):
+    """
+    The smallest `fields` and `depth` parameters that still return every output path.
+    """
+
+    paths: list[str]
+    fields: str
+    depth: int
+
+
+def parse_paths(raw: Any) -> list[str]:
+    """
+    Normalize output paths given as a comma- or newline-separated string or a list.
+
+    `author.name` selects `name` of the `author` reference. Duplicates and paths
+    already covered by a shorter one (`author.name` under `author`) are dropped.
+    """
+    if isinstance(raw, str):
+        parts = raw.replace("\n", ",").split(",")
+    else:
+        parts = list(raw or [])
+
+    paths = []
+    for part in parts:
+        segments = [_INDEX.sub("", segment).strip() for segment in str(part).split(".")]
+        path = ".".join(segment for segment in segments if segment and not segment.isdigit())
+        if path:
+            paths.append(path)
+
+    unique = list(dict.fromkeys(paths))
+    return [path for path in unique if not any(path.startswith(other + ".") for other in unique)]
+
+
+def plan_projection(output_paths: Any, fields: str = "") -> Optional[Projection]:
+    """
+    Compile output paths into `fields` and `depth`, or None when no paths are given.
+
+    Explicit `fields` are kept and `id` is always selected. Each dot is counted as
+    one reference hop, so the depth is an upper bound when a path walks into a
+    custom field instead of a reference.
+    """
+    paths = parse_paths(output_paths)
+    if not paths:
+        return None
+
+    paths = parse_paths(["id", *parse_paths(fields), *paths])
+    depth = min(MAX_DEPTH, max(1, *(path.count(".") for path in paths)))
+    return Projection(paths, ",".join(paths), depth)
+
+
+def select_paths(item: Any, paths: list[str]) -> Any:
+    """
+    Keep only `paths` of a record, the way the `fields` parameter trims API
+    responses. Lists are trimmed element by element.
+    """
+    tree: dict[str, Any] = {}
+    for path in paths:
+        node = tree
+        segments = path.split(".")
+        for segment in segments[:-1]:
+            node = node.setdefault(segment, {})
+            if node is None:
+                break
+        else:
+            node[segments[-1]] = None
+    return _select(item, tree)
+
+
+def _select(value: Any, tree: Optional[dict[str, Any]]) -> Any:
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [_select(element, tree) for element in value]
+    if isinstance(value, dict):
+        return {key: _select(value[key], subtree) for key, subtree in tree.items() if key in value}
+    return value
+
+
+def measure_savings(
+    client: MicrocmsClient | ClientView,
+    endpoint: str,
+    content_id: str,
+    baseline_params: dict[str, Any],
+    projection: Projection,
+    item_count: int,
+    projected_bytes: Optional[int] = None,
+) -> Optional[dict[str, Any]]:
+    """
+    Estimate the bytes a projection saved by fetching one sample item with and
+    without it. `projected_bytes` skips the projected request when the caller
+    already has that response. Returns None when a sample request fails.
+    """
+    full = client.get(endpoint, content_id, params=baseline_params)
+    if full.status_code != 200:
+        return None
+    if projected_bytes is None:
+        projected_params = {**baseline_params, "fields": projection.fields, "depth": projection.depth}
+        projected = client.get(endpoint, content_id, params=projected_params)
+        if projected.status_code != 200:
+            return None
+        projected_bytes = len(projected.content)
+
+    return {
+        "fields": projection.fields,
+        "depth": projection.depth,
+        "sample_id": content_id,
+        "full_bytes_per_item": len(full.content),
+        "projected_bytes_per_item": projected_bytes,
+        "estimated_bytes_saved": max(0, len(full.content) - projected_bytes) * item_count,
+    }
+
+
+def report_projection(
+    tool: Tool,
+    client: MicrocmsClient | ClientView,
+    endpoint: str,
+    projection: Projection,
+    baseline_params: dict[str, Any],
+    sample_id: Optional[str],
+    item_count: int,
+    metrics: Optional[InvocationMetrics] = None,
+    projected_bytes: Optional[int] = None,
+) -> Generator[ToolInvokeMessage]:
+    """
+    Describe the applied projection. When `metrics` is given the savings are
+    measured on `sample_id` and added to the metrics summary as `projection`.
+    """
+    yield tool.create_text_message(
+        f"Projected output to fields '{projection.fields}' at depth {projection.depth}"
+    )
+    if metrics is None or sample_id is None:
+        return
+
+    savings = measure_savings(client, endpoint, sample_id, baseline_params, projection, item_count, projected_bytes)
+    if savings is None:
+        return
+    metrics.annotate("projection", savings)
+    yield tool.create_text_message(
+        f"Projection saved about {savings['estimated_bytes_saved']} bytes "
+        f"({savings['full_bytes_per_item']} -> {savings['projected_bytes_per_item']} bytes per item)"
+    )
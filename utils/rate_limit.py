@@ -0,0 +1,238 @@
+import random
+import threading
+import time
+from collections.abc import Callable
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import requests
+
+from utils import config
+
+# Statuses worth retrying for an idempotent GET
+RETRYABLE_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+
+class DeadlineExceeded(requests.Timeout):
+    """
+    Raised when the invocation's time budget does not allow another attempt.
+    """
+
+
+class Deadline:
+    """
+    Time budget of one tool invocation. Work should stop being started once
+    only `reserve` seconds are left.
+    """
+
+    def __init__(self, seconds: float = config.INVOCATION_BUDGET, reserve: float = config.DEADLINE_RESERVE):
+        self.seconds = seconds
+        self.reserve = min(max(0.0, reserve), seconds / 2)
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def allows(self, seconds: float) -> bool:
+        return self.remaining() > seconds
+
+    def winding_down(self) -> bool:
+        return self.remaining() <= self.reserve
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled at `rate` tokens per second.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take one token and return how long the caller must wait before using it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= 1
+            wait = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+            return max(wait, self._paused_until - now)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hold back every caller for `seconds`, e.g. after a Retry-After response.
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class AdaptiveConcurrency:
+    """
+    Concurrency limit adjusted by AIMD: grows by about one slot per window of
+    successful requests and halves when the API throttles. Until the first
+    throttle it grows by one slot per success (slow start), so it can ramp
+    from `initial` towards `maximum` within one large fetch. It only grows
+    while every slot is in use.
+    """
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: int = 64, cooldown: float = 1.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.cooldown = cooldown
+        self._limit = float(min(max(initial, minimum), maximum))
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._slow_start = True
+        self._condition = threading.Condition()
+        self._listeners: list[Callable[[], None]] = []
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def acquire(self, deadline: Optional[Deadline] = None) -> None:
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                timeout = deadline.remaining() if deadline else None
+                if timeout is not None and timeout <= 0:
+                    raise DeadlineExceeded("Time budget exhausted while waiting for a request slot")
+                self._condition.wait(timeout)
+            self._in_flight += 1
+
+    def try_acquire(self) -> bool:
+        """
+        Take a slot if one is free, without waiting; for callers that cannot block a thread.
+        """
+        with self._condition:
+            if self._in_flight >= int(self._limit):
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify()
+        self._notify()
+
+    def on_success(self) -> None:
+        with self._condition:
+            previous = int(self._limit)
+            if self._in_flight >= previous:
+                step = 1.0 if self._slow_start else 1.0 / self._limit
+                self._limit = min(self.maximum, self._limit + step)
+            grew = int(self._limit) > previous
+            self._condition.notify()
+        if grew:
+            self._notify()
+
+    def on_throttle(self) -> None:
+        with self._condition:
+            now = time.monotonic()
+            # One burst of 429s should only halve the limit once
+            if now - self._last_decrease >= self.cooldown:
+                self._limit = max(self.minimum, self._limit / 2)
+                self._last_decrease = now
+            self._slow_start = False
+
+    def add_listener(self, listener: Callable[[], None]) -> None:
+        """
+        Call `listener` whenever a slot may have become free; it runs on the releasing thread.
+        """
+        with self._condition:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[], None]) -> None:
+        with self._condition:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _notify(self) -> None:
+        with self._condition:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener()
+
+
+class DomainLimiter:
+    """
+    Rate and concurrency limits shared by every request to one service domain.
+    """
+
+    def __init__(
+        self,
+        rate: float = config.RATE_LIMIT,
+        burst: int = config.RATE_LIMIT_BURST,
+        max_concurrency: int = config.MAX_CONCURRENCY,
+        concurrency_ceiling: int = config.ASYNC_MAX_IN_FLIGHT,
+    ):
+        self.bucket = TokenBucket(rate, burst)
+        # Starts at max_concurrency and ramps up to the ceiling while the API keeps up
+        self.concurrency = AdaptiveConcurrency(
+            initial=max_concurrency, maximum=max(max_concurrency, concurrency_ceiling)
+        )
+
+    def acquire(self, deadline: Optional[Deadline] = None) -> None:
+        wait = self.bucket.reserve()
+        if wait > 0:
+            if deadline is not None and not deadline.allows(wait):
+                raise DeadlineExceeded("Time budget exhausted while waiting for the rate limit")
+            time.sleep(wait)
+        self.concurrency.acquire(deadline)
+
+    def release(self) -> None:
+        self.concurrency.release()
+
+    def on_success(self) -> None:
+        self.concurrency.on_success()
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        self.concurrency.on_throttle()
+        if retry_after:
+            self.bucket.pause(retry_after)
+
+
+_limiters: dict[str, DomainLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(service_domain: str) -> DomainLimiter:
+    with _limiters_lock:
+        limiter = _limiters.get(service_domain)
+        if limiter is None:
+            limiter = DomainLimiter()
+            _limiters[service_domain] = limiter
+        return limiter
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header given either in seconds or as an HTTP date.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float = config.RETRY_BACKOFF_BASE, cap: float = config.RETRY_BACKOFF_MAX) -> float:
+    """
+    Exponential backoff with full jitter for the given retry attempt (0-based).
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
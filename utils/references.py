@@ -0,0 +1,187 @@
+from typing import Any, Optional
+
+from utils.async_engine import FetchRequest, FetchResult
+from utils.batch import build_ids_params, chunk_ids, order_by_ids
+from utils.client import ClientView, MicrocmsClient
+from utils.rate_limit import DeadlineExceeded
+
+REFERENCE_MODES = ("off", "normalized", "inline")
+
+# microCMS expands references at most three levels deep
+MAX_DEPTH = 3
+
+
+def parse_reference_fields(raw: str) -> dict[str, str]:
+    """
+    Parse `field=endpoint` pairs such as "author=authors,tags=tags".
+    """
+    mapping = {}
+    for item in (raw or "").replace("\n", ",").split(","):
+        field, _, endpoint = item.partition("=")
+        if field.strip() and endpoint.strip():
+            mapping[field.strip()] = endpoint.strip()
+    return mapping
+
+
+def reference_ids(value: Any) -> list[str]:
+    """
+    IDs held by a reference field, which is an ID, an object with `id`, or a
+    list of either.
+    """
+    values = value if isinstance(value, list) else [value]
+    ids = []
+    for item in values:
+        if isinstance(item, dict):
+            item = item.get("id")
+        if isinstance(item, str) and item:
+            ids.append(item)
+    return ids
+
+
+class ReferenceExpander:
+    """
+    Resolves reference fields of fetched content, fetching every distinct
+    referenced record once per invocation, 100 IDs per request.
+
+    Content is fetched at `depth=0`; references found in resolved records are
+    followed up to `depth` levels, like the API's own `depth`. `normalized`
+    returns the records once under `entities`, `inline` puts copies back
+    into the content.
+    """
+
+    def __init__(
+        self,
+        client: MicrocmsClient | ClientView,
+        reference_fields: dict[str, str],
+        mode: str = "normalized",
+        depth: int = 1,
+        max_in_flight: int = 5,
+    ):
+        self.client = client
+        self.reference_fields = reference_fields
+        self.mode = mode if mode in REFERENCE_MODES[1:] else "normalized"
+        self.depth = min(max(depth, 1), MAX_DEPTH)
+        self.max_in_flight = max(1, max_in_flight)
+        self.entities: dict[str, dict[str, dict]] = {}
+        self.errors: list[dict] = []
+        self._pending: dict[str, dict[str, int]] = {}
+        self._failed: set[tuple[str, str]] = set()
+
+    @property
+    def normalized(self) -> bool:
+        return self.mode == "normalized"
+
+    def collect(self, items: list[dict], level: int = 1) -> None:
+        """
+        Queue the references of `items` (found at `level`) for fetching.
+        """
+        for item in items:
+            for field, endpoint in self.reference_fields.items():
+                for cid in reference_ids(item.get(field)):
+                    known = cid in self.entities.get(endpoint, {}) or (endpoint, cid) in self._failed
+                    if not known:
+                        queued = self._pending.setdefault(endpoint, {})
+                        queued[cid] = min(queued.get(cid, level), level)
+
+    def resolve(self) -> None:
+        """
+        Fetch every queued reference, then the references of those records,
+        up to `depth` levels.
+        """
+        while self._pending:
+            pending, self._pending = self._pending, {}
+            fetch_requests = []
+            chunks = {}
+            for endpoint, queued in pending.items():
+                for chunk in chunk_ids(list(queued)):
+                    fetch_requests.append(FetchRequest(endpoint, None, build_ids_params(chunk, {"depth": 0})))
+                    chunks[len(fetch_requests) - 1] = (chunk, queued)
+
+            with self.client.stream(fetch_requests, max_in_flight=self.max_in_flight) as stream:
+                handled: set[int] = set()
+                try:
+                    for result in stream:
+                        handled.add(result.index)
+                        self._store(result, chunks)
+                except DeadlineExceeded:
+                    # Requests stalled past the deadline; what arrived is kept
+                    for index, fetch_request in enumerate(fetch_requests):
+                        if index not in handled:
+                            self._fail(fetch_request.endpoint, chunks[index][0], "Time budget exhausted")
+                    continue
+
+                # Chunks the time budget did not allow for stay unresolved
+                for index, request in stream.unfinished:
+                    self._fail(request.endpoint, chunks[index][0], "Time budget exhausted")
+
+    def _store(self, result: FetchResult, chunks: dict[int, tuple[list[str], dict[str, int]]]) -> None:
+        endpoint = result.request.endpoint
+        chunk, queued = chunks[result.index]
+        if result.error is not None or result.response.status_code != 200:
+            error = result.error or f"HTTP {result.response.status_code}"
+            self._fail(endpoint, chunk, error)
+            return
+
+        records = order_by_ids(result.response.json().get("contents", []), chunk)
+        found = self.entities.setdefault(endpoint, {})
+        for record in records:
+            found[record["id"]] = record
+            level = queued.get(record["id"], self.depth)
+            if level < self.depth:
+                self.collect([record], level + 1)
+        self._fail(endpoint, [cid for cid in chunk if cid not in found], "Not found")
+
+    def inline(self, items: list[dict]) -> list[dict]:
+        """
+        Copies of `items` with references replaced by the referenced records.
+        """
+        self.collect(items)
+        self.resolve()
+        return [self._inline(item, 1) for item in items]
+
+    def payload(self, items: Optional[list[dict]] = None) -> dict[str, Any]:
+        """
+        `entities` and `refs` of the normalized output. With `items`, only
+        the records they reference (directly or through other records) are included.
+        """
+        self.resolve()
+        if items is None:
+            entities = self.entities
+        else:
+            entities = {}
+            self._gather(items, 1, entities)
+        return {"entities": entities, "refs": dict(self.reference_fields)}
+
+    def _gather(self, items: list[dict], level: int, entities: dict[str, dict[str, dict]]) -> None:
+        for item in items:
+            for field, endpoint in self.reference_fields.items():
+                for cid in reference_ids(item.get(field)):
+                    record = self.entities.get(endpoint, {}).get(cid)
+                    if record is not None and cid not in entities.setdefault(endpoint, {}):
+                        entities[endpoint][cid] = record
+                        if level < self.depth:
+                            self._gather([record], level + 1, entities)
+
+    def _inline(self, item: dict, level: int) -> dict:
+        copy = dict(item)
+        for field, endpoint in self.reference_fields.items():
+            if field not in item:
+                continue
+            value = item[field]
+            resolved = [
+                self._resolve_one(endpoint, ref, level) for ref in (value if isinstance(value, list) else [value])
+            ]
+            copy[field] = resolved if isinstance(value, list) else resolved[0]
+        return copy
+
+    def _resolve_one(self, endpoint: str, ref: Any, level: int) -> Any:
+        ids = reference_ids(ref)
+        record = self.entities.get(endpoint, {}).get(ids[0]) if ids else None
+        if record is None:
+            return ref
+        return self._inline(record, level + 1) if level < self.depth else record
+
+    def _fail(self, endpoint: str, content_ids: list[str], error: str) -> None:
+        for cid in content_ids:
+            self._failed.add((endpoint, cid))
+            self.errors.append({"content_id": f"{endpoint}/{cid}", "error": error})
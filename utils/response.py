@@ -0,0 +1,76 @@
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Optional
+
+from utils import codec
+
+if TYPE_CHECKING:
+    from utils.instrumentation import RequestMetrics
+
+
+class _ParsedBody:
+    """
+    Decoded body shared by a response and its copies, decoded at most once.
+    """
+
+    __slots__ = ("lock", "value", "done")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value: Any = None
+        self.done = False
+
+
+class ApiResponse:
+    """
+    Minimal stand-in for `requests.Response` holding an already-read body.
+
+    The decoded body is memoized and shared with copies made by `share()`,
+    so treat the result of `json()` as read-only.
+    """
+
+    from_cache = False
+
+    def __init__(self, status_code: int, content: bytes, headers: Optional[dict[str, str]] = None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.metrics: Optional["RequestMetrics"] = None
+        self._body = _ParsedBody()
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8")
+
+    def json(self) -> Any:
+        body = self._body
+        with body.lock:
+            if not body.done:
+                started = time.perf_counter()
+                try:
+                    body.value = codec.loads(self.content)
+                    body.done = True
+                finally:
+                    if self.metrics is not None:
+                        self.metrics.parse_ms += (time.perf_counter() - started) * 1000
+            return body.value
+
+    def share(self) -> "ApiResponse":
+        """
+        Copy for another caller of a coalesced request. The copy gets its own
+        `metrics` but decodes the body together with this response.
+        """
+        copy = ApiResponse(self.status_code, self.content, self.headers)
+        copy._body = self._body
+        return copy
+
+    def list_envelope(self) -> dict[str, int]:
+        """
+        `totalCount`, `offset` and `limit` of a list response, read from the
+        body tail when possible instead of decoding every item.
+        """
+        envelope = codec.list_envelope(self.content)
+        if envelope is None:
+            data = self.json()
+            envelope = {key: data.get(key, 0) for key in ("totalCount", "offset", "limit")}
+        return envelope
@@ -0,0 +1,55 @@
+import base64
+import hashlib
+import zlib
+from typing import Any, NamedTuple, Optional
+
+from utils import codec
+from utils.cache import request_key
+
+CURSOR_VERSION = 1
+
+
+class ResumeCursor(NamedTuple):
+    """
+    Work an invocation left for the next one: content IDs still to fetch and
+    list offsets whose pages were not fetched. `fingerprint` ties the cursor
+    to the query it came from.
+    """
+
+    endpoint: str
+    fingerprint: str
+    ids: list[str]
+    offsets: list[int]
+
+
+def query_fingerprint(endpoint: str, params: Optional[dict[str, Any]] = None) -> str:
+    return hashlib.sha256(request_key("", endpoint, None, params).encode("utf-8")).hexdigest()[:16]
+
+
+def encode_cursor(cursor: ResumeCursor) -> str:
+    """
+    Pack a cursor into an opaque, URL-safe string.
+    """
+    payload = codec.dumps({
+        "v": CURSOR_VERSION,
+        "endpoint": cursor.endpoint,
+        "fingerprint": cursor.fingerprint,
+        "ids": cursor.ids,
+        "offsets": cursor.offsets,
+    })
+    return base64.urlsafe_b64encode(zlib.compress(payload.encode("utf-8"))).decode("ascii")
+
+
+def decode_cursor(raw: str, endpoint: str, fingerprint: str) -> ResumeCursor:
+    """
+    Unpack a cursor, checking that it was issued for the same endpoint and query.
+    """
+    try:
+        data = codec.loads(zlib.decompress(base64.urlsafe_b64decode(raw.strip().encode("ascii"))))
+    except Exception:
+        raise ValueError("Resume cursor is not valid")
+    if not isinstance(data, dict) or data.get("v") != CURSOR_VERSION:
+        raise ValueError("Resume cursor is not valid")
+    if data.get("endpoint") != endpoint or data.get("fingerprint") != fingerprint:
+        raise ValueError("Resume cursor was issued for a different endpoint or query; pass the same parameters as the call that returned it")
+    return ResumeCursor(endpoint, fingerprint, [str(cid) for cid in data.get("ids", [])], [int(o) for o in data.get("offsets", [])])
@@ -0,0 +1,456 @@
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from html.parser import HTMLParser
+from typing import Any, Optional, Union
+
+from utils import config
+
+TEXT_FORMATS = ("markdown", "text")
+
+# HTML is fed to the parser in slices of this many characters
+FEED_SIZE = 16 * 1024
+
+_SPACE = re.compile(r"\s+")
+
+_BLOCK_TAGS = {
+    "p", "div", "section", "article", "header", "footer", "figure", "figcaption",
+    "ul", "ol", "table", "blockquote", "pre", "h1", "h2", "h3", "h4", "h5", "h6",
+}
+_INLINE_MARKS = {"strong": "**", "b": "**", "em": "_", "i": "_", "s": "~~", "del": "~~", "strike": "~~", "code": "`"}
+_SKIPPED_TAGS = {"script", "style", "template"}
+
+# Object-format node types (lowercase, without separators) mapped to the HTML tags they render as
+_NODE_TAGS = {
+    "paragraph": "p",
+    "bulletlist": "ul",
+    "orderedlist": "ol",
+    "listitem": "li",
+    "blockquote": "blockquote",
+    "codeblock": "pre",
+    "hardbreak": "br",
+    "horizontalrule": "hr",
+    "image": "img",
+    "table": "table",
+    "tablerow": "tr",
+    "tablecell": "td",
+    "tableheader": "th",
+}
+_MARK_TAGS = {"bold": "strong", "italic": "em", "strike": "s", "code": "code", "link": "a"}
+
+
+class _Converter(HTMLParser):
+    """
+    Renders HTML events as markdown or plain text into `out`.
+    """
+
+    def __init__(self, markdown: bool):
+        super().__init__(convert_charrefs=True)
+        self.markdown = markdown
+        self.out: list[str] = []
+        self._started = False
+        self._break = 0
+        self._break_quote = 0
+        self._line_start = True
+        self._prefix = ""
+        self._marks: list[str] = []
+        self._lists: list[list[int]] = []
+        self._links: list[Optional[str]] = []
+        self._cells = 0
+        self._header_cells = 0
+        self._quote = 0
+        self._pre = 0
+        self._skip = 0
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, Optional[str]]]) -> None:
+        attributes = dict(attrs)
+        if tag in _SKIPPED_TAGS:
+            self._skip += 1
+        elif tag in _BLOCK_TAGS:
+            # A list nested in a list item starts on the next line
+            self._block(1 if tag in ("ul", "ol") and self._lists else 2)
+            if tag == "pre":
+                if self.markdown:
+                    self._write("```")
+                    self._block(1)
+                self._pre += 1
+            elif tag in ("ul", "ol"):
+                self._lists.append([tag == "ol", 0])
+            elif tag == "blockquote":
+                self._quote += 1
+            elif tag == "table":
+                self._header_cells = 0
+            elif tag[0] == "h" and tag[1:].isdigit() and self.markdown:
+                self._prefix = "#" * int(tag[1:]) + " "
+        elif tag == "li":
+            self._block(1)
+            indent = "  " * max(len(self._lists) - 1, 0)
+            if self._lists and self._lists[-1][0]:
+                self._lists[-1][1] += 1
+                self._prefix = f"{indent}{self._lists[-1][1]}. "
+            else:
+                self._prefix = f"{indent}- "
+        elif tag == "tr":
+            self._block(1)
+            self._cells = 0
+        elif tag in ("td", "th"):
+            if self._cells:
+                self._write(" | ")
+            self._cells += 1
+            if tag == "th":
+                self._header_cells += 1
+        elif tag == "br":
+            self._block(1)
+        elif tag == "hr":
+            self._block(2)
+            if self.markdown:
+                self._write("---")
+            self._block(2)
+        elif tag == "img":
+            alt = (attributes.get("alt") or "").strip()
+            src = attributes.get("src") or ""
+            if self.markdown and src:
+                self._write(f"![{alt}]({src})")
+            elif alt:
+                self._write(alt)
+        elif tag == "a":
+            self._links.append(attributes.get("href"))
+            if self.markdown and attributes.get("href"):
+                self._marks.append("[")
+        elif tag in _INLINE_MARKS and self.markdown and not self._pre:
+            self._marks.append(_INLINE_MARKS[tag])
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in _SKIPPED_TAGS:
+            self._skip = max(self._skip - 1, 0)
+        elif tag in _BLOCK_TAGS:
+            if tag == "pre":
+                self._pre = max(self._pre - 1, 0)
+                if self.markdown:
+                    self._block(1)
+                    self._write("```")
+            elif tag in ("ul", "ol") and self._lists:
+                self._lists.pop()
+            elif tag == "blockquote":
+                self._quote = max(self._quote - 1, 0)
+            self._prefix = ""
+            self._block(1 if tag in ("ul", "ol") and self._lists else 2)
+        elif tag == "tr":
+            # A header row gets the separator line that makes it a markdown table
+            if self.markdown and self._header_cells and self._cells:
+                self._block(1)
+                self._write(" | ".join(["---"] * self._cells))
+            self._header_cells = 0
+        elif tag == "a" and self._links:
+            href = self._links.pop()
+            if self.markdown and href:
+                self._close_mark("[", f"]({href})")
+        elif tag in _INLINE_MARKS and self.markdown and not self._pre:
+            self._close_mark(_INLINE_MARKS[tag], _INLINE_MARKS[tag])
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, Optional[str]]]) -> None:
+        self.handle_starttag(tag, attrs)
+        if tag not in ("br", "hr", "img"):
+            self.handle_endtag(tag)
+
+    def handle_data(self, data: str) -> None:
+        if self._skip:
+            return
+        if self._pre:
+            self._write(data, raw=True)
+            return
+        text = _SPACE.sub(" ", data)
+        if self._line_start:
+            text = text.lstrip(" ")
+        if text:
+            self._write(text)
+
+    def _block(self, lines: int) -> None:
+        if self._pre:
+            return
+        # Blank lines only belong to a quote when the quote encloses both sides
+        self._break_quote = min(self._break_quote, self._quote) if self._break else self._quote
+        self._break = max(self._break, lines)
+        if self.out and self.out[-1].endswith(" "):
+            self.out[-1] = self.out[-1].rstrip(" ")
+        self._line_start = True
+
+    def _write(self, text: str, raw: bool = False) -> None:
+        if self._break:
+            if self._started:
+                blank = ">" * self._break_quote if self.markdown else ""
+                quote = "> " * self._quote if self.markdown else ""
+                self.out.append(("\n" + blank) * (self._break - 1) + "\n" + quote)
+            elif self.markdown and self._quote:
+                self.out.append("> " * self._quote)
+            self._break = 0
+        if self._prefix:
+            self.out.append(self._prefix)
+            self._prefix = ""
+        if self._marks and not raw:
+            # Leading space stays outside the mark: "a **b**", not "a** b**"
+            if text.startswith(" "):
+                self.out.append(" ")
+                text = text[1:]
+            self.out.append("".join(self._marks))
+            self._marks = []
+        self.out.append(text)
+        self._started = True
+        self._line_start = raw and text.endswith("\n")
+
+    def _close_mark(self, opening: str, closing: str) -> None:
+        if opening in self._marks:
+            # Nothing was written inside the mark
+            self._marks.remove(opening)
+            return
+        if self.out and self.out[-1].endswith(" "):
+            self.out[-1] = self.out[-1].rstrip(" ")
+            self.out.append(closing + " ")
+        else:
+            self.out.append(closing)
+
+    def take(self, keep_last: bool = True) -> list[str]:
+        """
+        Remove and return the finished output; the last piece is kept back
+        while it may still be trimmed.
+        """
+        if keep_last and self.out:
+            pieces, self.out = self.out[:-1], self.out[-1:]
+        else:
+            pieces, self.out = self.out, []
+        return pieces
+
+
+def _node_events(converter: _Converter, node: Any) -> None:
+    """
+    Replay an object-format node tree as HTML events.
+    """
+    if isinstance(node, list):
+        for child in node:
+            _node_events(converter, child)
+        return
+    if isinstance(node, str):
+        converter.handle_data(node)
+        return
+    if not isinstance(node, dict):
+        return
+
+    node_type = re.sub(r"[_\-]", "", str(node.get("type", ""))).lower()
+    attrs = node.get("attrs") or {}
+    if node_type == "text":
+        marks = [mark for mark in node.get("marks") or [] if isinstance(mark, dict)]
+        tags = [(_MARK_TAGS.get(str(mark.get("type", "")).lower()), mark.get("attrs") or {}) for mark in marks]
+        tags = [(tag, mark_attrs) for tag, mark_attrs in tags if tag]
+        for tag, mark_attrs in tags:
+            converter.handle_starttag(tag, [("href", mark_attrs.get("href"))] if tag == "a" else [])
+        converter.handle_data(str(node.get("text", "")))
+        for tag, _ in reversed(tags):
+            converter.handle_endtag(tag)
+        return
+
+    if node_type == "heading":
+        tag = f"h{min(max(int(attrs.get('level', 1) or 1), 1), 6)}"
+    else:
+        tag = _NODE_TAGS.get(node_type)
+    if tag is None:
+        # Unknown wrappers (such as the document node) only contribute their children
+        if "text" in node:
+            converter.handle_data(str(node["text"]))
+        _node_events(converter, node.get("content") or node.get("children") or [])
+        return
+
+    if tag in ("br", "hr", "img"):
+        converter.handle_startendtag(tag, [(key, str(value)) for key, value in attrs.items() if value is not None])
+        return
+    converter.handle_starttag(tag, [])
+    _node_events(converter, node.get("content") or node.get("children") or [])
+    converter.handle_endtag(tag)
+
+
+def iter_text(source: Any, text_format: str = "markdown") -> Iterator[str]:
+    """
+    Convert a rich editor value (an HTML string or an object-format node
+    tree) to markdown or plain text, yielding output pieces as the input is
+    consumed; HTML is parsed `FEED_SIZE` characters at a time.
+    """
+    converter = _Converter(markdown=text_format != "text")
+    if isinstance(source, str):
+        for start in range(0, len(source), FEED_SIZE):
+            converter.feed(source[start:start + FEED_SIZE])
+            yield from converter.take()
+        converter.close()
+    else:
+        _node_events(converter, source)
+    yield from converter.take(keep_last=False)
+
+
+def chunk_text(pieces: Iterable[str], chunk_size: int) -> list[str]:
+    """
+    Split streamed text into chunks of at most `chunk_size` characters,
+    preferring paragraph, line, sentence and word boundaries.
+    """
+    chunks = []
+    buffer = ""
+    for piece in pieces:
+        buffer += piece
+        while len(buffer) > chunk_size:
+            cut = _split_point(buffer, chunk_size)
+            chunk = buffer[:cut].strip()
+            if chunk:
+                chunks.append(chunk)
+            buffer = buffer[cut:].lstrip()
+    if buffer.strip():
+        chunks.append(buffer.strip())
+    return chunks
+
+
+def _split_point(text: str, limit: int) -> int:
+    window = text[:limit + 1]
+    for separator in ("\n\n", "\n", ". ", "。", " "):
+        position = window.rfind(separator)
+        if position > limit // 2:
+            return position + len(separator)
+    return limit
+
+
+def convert(source: Any, text_format: str = "markdown", chunk_size: int = 0) -> Union[str, list[str]]:
+    """
+    Convert a rich editor value; with `chunk_size`, return a list of chunks.
+    """
+    pieces = iter_text(source, text_format)
+    if chunk_size > 0:
+        return chunk_text(pieces, chunk_size)
+    return "".join(pieces).strip()
+
+
+class ConversionCache:
+    """
+    Thread-safe LRU cache of converted rich editor values, capped by the
+    total number of characters held.
+    """
+
+    def __init__(self, max_chars: int = config.RICH_TEXT_CACHE_MAX_CHARS):
+        self.max_chars = max_chars
+        self._entries: OrderedDict[str, tuple[Union[str, list[str]], int]] = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Union[str, list[str]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: str, value: Union[str, list[str]]) -> None:
+        size = len(key) + (len(value) if isinstance(value, str) else sum(len(chunk) for chunk in value))
+        if size > self.max_chars:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._chars -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._chars += size
+            while self._chars > self.max_chars and self._entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._chars -= evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._chars = 0
+
+
+conversion_cache = ConversionCache()
+
+
+def parse_rich_text_fields(raw: str) -> list[list[str]]:
+    """
+    Parse comma-separated field paths; `blocks.body` converts `body` in each
+    element of the `blocks` repeater.
+    """
+    paths = []
+    for item in (raw or "").replace("\n", ",").split(","):
+        parts = [part.strip() for part in item.strip().split(".") if part.strip()]
+        if parts and parts not in paths:
+            paths.append(parts)
+    return paths
+
+
+class RichTextConverter:
+    """
+    Replaces rich editor fields of content items with markdown or plain text.
+
+    Converted values are cached by content ID and `updatedAt`, so an
+    unchanged item is never converted twice; items without both, or
+    fetched with a draft key, are converted without the cache.
+    """
+
+    def __init__(
+        self,
+        scope: str,
+        endpoint: str,
+        fields: list[list[str]],
+        text_format: str = "markdown",
+        chunk_size: int = 0,
+        use_cache: bool = True,
+    ):
+        self.scope = scope
+        self.endpoint = endpoint
+        self.fields = fields
+        self.text_format = text_format if text_format in TEXT_FORMATS else "markdown"
+        self.chunk_size = max(0, chunk_size)
+        self.use_cache = use_cache
+        self.converted = 0
+        self.cached = 0
+
+    def apply(self, item: dict) -> dict:
+        """
+        Return a copy of `item` with its rich editor fields converted; the
+        item itself is left untouched.
+        """
+        if not isinstance(item, dict):
+            return item
+        key = None
+        if self.use_cache and item.get("id") and item.get("updatedAt"):
+            key = (
+                f"{self.scope}/{self.endpoint}/{item['id']}@{item['updatedAt']}"
+                f"#{self.text_format}:{self.chunk_size}"
+            )
+        for path in self.fields:
+            item = self._apply_path(item, path, key, path[0])
+        return item
+
+    def stats(self) -> dict[str, Any]:
+        return {"format": self.text_format, "converted": self.converted, "cached": self.cached}
+
+    def _apply_path(self, value: Any, path: list[str], key: Optional[str], location: str) -> Any:
+        if isinstance(value, list):
+            return [self._apply_path(element, path, key, f"{location}[{i}]") for i, element in enumerate(value)]
+        if not isinstance(value, dict) or path[0] not in value:
+            return value
+
+        copy = dict(value)
+        if len(path) > 1:
+            copy[path[0]] = self._apply_path(value[path[0]], path[1:], key, f"{location}.{path[1]}")
+        else:
+            copy[path[0]] = self._convert(value[path[0]], f"{key}/{location}" if key else None)
+        return copy
+
+    def _convert(self, source: Any, key: Optional[str]) -> Any:
+        if source is None or source == "":
+            return source
+        if key is not None:
+            # Which format the editor returned is part of the identity of the source
+            key = f"{key}/{'html' if isinstance(source, str) else 'object'}"
+            converted = conversion_cache.get(key)
+            if converted is not None:
+                self.cached += 1
+                return converted
+        converted = convert(source, self.text_format, self.chunk_size)
+        self.converted += 1
+        if key is not None:
+            conversion_cache.put(key, converted)
+        return converted
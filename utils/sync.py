@@ -0,0 +1,58 @@
+from typing import Any, Optional
+
+from utils import codec
+from utils.client import ClientView, MicrocmsClient
+from utils.pagination import iter_pages
+
+# Cheap list projection used to detect changes
+VERSION_FIELDS = "id,updatedAt,revisedAt"
+
+
+def content_version(item: dict[str, Any]) -> str:
+    """
+    Version marker of a record; changes whenever the record is updated.
+    """
+    return item.get("updatedAt") or item.get("revisedAt") or ""
+
+
+def load_snapshot(raw: Any) -> dict[str, str]:
+    """
+    Parse a snapshot given as a JSON object (or dict) mapping content ID to version.
+    """
+    if not raw:
+        return {}
+    if isinstance(raw, str):
+        raw = codec.loads(raw)
+    if not isinstance(raw, dict):
+        raise ValueError("Snapshot must be a JSON object mapping content IDs to updatedAt values")
+    return {str(cid): str(version) for cid, version in raw.items()}
+
+
+def list_versions(
+    client: MicrocmsClient | ClientView,
+    endpoint: str,
+    list_params: Optional[dict[str, Any]] = None,
+    max_concurrent: int = 5,
+) -> dict[str, str]:
+    """
+    Fetch the current version of every record matching `list_params`.
+    """
+    params = {k: v for k, v in (list_params or {}).items() if k not in ("limit", "offset")}
+    params["fields"] = VERSION_FIELDS
+
+    versions = {}
+    # Versions must be current, so the cache is bypassed
+    for page in iter_pages(client, endpoint, params, max_concurrent=max_concurrent, use_cache=False):
+        for item in page.get("contents", []):
+            versions[item["id"]] = content_version(item)
+    return versions
+
+
+def diff_snapshot(previous: dict[str, str], current: dict[str, str]) -> tuple[list[str], list[str], list[str]]:
+    """
+    Compare two snapshots and return (created, updated, deleted) content IDs.
+    """
+    created = [cid for cid in current if cid not in previous]
+    updated = [cid for cid, version in current.items() if cid in previous and previous[cid] != version]
+    deleted = [cid for cid in previous if cid not in current]
+    return created, updated, deleted